@@ -4,12 +4,12 @@ of Arguments. This instance intends to provide type hints which we wouldn't
 get if we returned the original Namespace object from argparse module.
 """
 import os
-from typing import Set
+from typing import Optional, Set
 
 from argparse import ArgumentParser
 from dataclasses import dataclass
 
-from definitions import IndexingFormat
+from definitions import IndexingFormat, PostingsCodec, SearchMode
 
 
 @dataclass
@@ -19,6 +19,10 @@ class Arguments:
     stopwords: Set[str]
     use_potter_stemmer: bool
     memory_threshold: float
+    block_memory: Optional[int]
+    block_writer_depth: int
+    merge_fan_in: int
+    merge_workers: int
     index_path: str
     indexing_format: IndexingFormat
     debug_mode: bool
@@ -30,6 +34,12 @@ class Arguments:
     results_path: str
     evaluation_path: str
     query_limit: int
+    vocabulary_cache_memory: int
+    postings_codec: PostingsCodec
+    search_mode: SearchMode
+    store_positions: bool
+    workers: int
+    indexing_batch_size: int
 
 
 def _positive_int(value_str: str) -> int:
@@ -40,6 +50,22 @@ def _positive_int(value_str: str) -> int:
     return value
 
 
+def _non_negative_int(value_str: str) -> int:
+    value = int(value_str)
+    if value < 0:
+        raise ValueError(f"The value provided ({value}) is not a non negative integer")
+
+    return value
+
+
+def _fan_in(value_str: str) -> int:
+    value = int(value_str)
+    if value < 2:
+        raise ValueError(f"The value provided ({value}) is not a fan-in of at least 2")
+
+    return value
+
+
 def _float_between_zero_and_one(value_str: str) -> float:
     value = float(value_str)
     if value < 0.0 or value > 1.0:
@@ -48,6 +74,21 @@ def _float_between_zero_and_one(value_str: str) -> float:
     return value
 
 
+def memory_size(value_str: str) -> int:
+    units = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+    value_str = value_str.strip().upper()
+
+    if value_str[-1:] in units:
+        value = int(float(value_str[:-1]) * units[value_str[-1]])
+    else:
+        value = int(value_str)
+
+    if value <= 0:
+        raise ValueError(f"The value provided ({value_str}) is not a positive memory size")
+
+    return value
+
+
 def _read_stopwords_file(file_path: str) -> Set[str]:
     stopwords = set()
     with open(_existing_path(file_path), encoding="utf-8") as sw_file:
@@ -69,6 +110,10 @@ default_arguments = {
     "stopwords": _read_stopwords_file("data/stopwords.txt"),
     "use_potter_stemmer": True,
     "memory_threshold": 0.5,
+    "block_memory": None,
+    "block_writer_depth": 0,
+    "merge_fan_in": 64,
+    "merge_workers": 1,
     "index_path": "results/segmented_index",
     "indexing_format": IndexingFormat.TF_IDF,
     "debug_mode": False,
@@ -80,7 +125,13 @@ default_arguments = {
     "query_rev_path": "data/queries.relevance.txt",
     "results_path": "results/results.txt",
     "evaluation_path": "results/evaluation.txt",
-    "query_limit": 100
+    "query_limit": 100,
+    "vocabulary_cache_memory": 128 * 1024 * 1024,
+    "postings_codec": PostingsCodec.VBYTE,
+    "search_mode": SearchMode.EXHAUSTIVE,
+    "store_positions": True,
+    "workers": 1,
+    "indexing_batch_size": 10000
 }
 
 arg_parser = ArgumentParser(
@@ -131,6 +182,38 @@ arg_parser.add_argument(
     default=default_arguments["memory_threshold"]
 )
 
+# Memory budget of each block, replaces the memory threshold when given
+arg_parser.add_argument(
+    "-bm", "--block-memory",
+    dest="block_memory",
+    type=memory_size,
+    default=default_arguments["block_memory"]
+)
+
+# Number of blocks that may be written in the background while indexing
+arg_parser.add_argument(
+    "-bwd", "--block-writer-depth",
+    dest="block_writer_depth",
+    type=_non_negative_int,
+    default=default_arguments["block_writer_depth"]
+)
+
+# Maximum number of blocks merged at once
+arg_parser.add_argument(
+    "-mfi", "--merge-fan-in",
+    dest="merge_fan_in",
+    type=_fan_in,
+    default=default_arguments["merge_fan_in"]
+)
+
+# Number of processes merging the blocks into the index by term range
+arg_parser.add_argument(
+    "-mw", "--merge-workers",
+    dest="merge_workers",
+    type=_positive_int,
+    default=default_arguments["merge_workers"]
+)
+
 # Handling index path
 arg_parser.add_argument(
     "-out", "--index-path",
@@ -222,6 +305,53 @@ arg_parser.add_argument(
     default=default_arguments["query_limit"]
 )
 
+# Handling the memory budget of the searcher vocabulary cache
+arg_parser.add_argument(
+    "-vcm", "--vocabulary-cache-memory",
+    dest="vocabulary_cache_memory",
+    type=memory_size,
+    default=default_arguments["vocabulary_cache_memory"]
+)
+
+# Handling the encoding of the postings
+arg_parser.add_argument(
+    "-pc", "--postings-codec",
+    dest="postings_codec",
+    type=PostingsCodec,
+    default=default_arguments["postings_codec"]
+)
+
+# Handling the query evaluation strategy of BM25 indexes
+arg_parser.add_argument(
+    "-sm", "--search-mode",
+    dest="search_mode",
+    type=SearchMode,
+    default=default_arguments["search_mode"]
+)
+
+# Handling the storage of the term positions
+arg_parser.add_argument(
+    "-npos", "--no-positions",
+    dest="store_positions",
+    action="store_false",
+    default=default_arguments["store_positions"]
+)
+
+# Handling the parallel processing of the reviews
+arg_parser.add_argument(
+    "-w", "--workers",
+    dest="workers",
+    type=_positive_int,
+    default=default_arguments["workers"]
+)
+
+arg_parser.add_argument(
+    "-ibs", "--indexing-batch-size",
+    dest="indexing_batch_size",
+    type=_positive_int,
+    default=default_arguments["indexing_batch_size"]
+)
+
 
 def get_arguments():
     global arg_parser
@@ -234,6 +364,10 @@ def get_arguments():
         arg_values.stopwords,
         arg_values.use_potter_stemmer,
         arg_values.memory_threshold,
+        arg_values.block_memory,
+        arg_values.block_writer_depth,
+        arg_values.merge_fan_in,
+        arg_values.merge_workers,
         arg_values.index_path,
         arg_values.indexing_format,
         arg_values.debug_mode,
@@ -244,7 +378,13 @@ def get_arguments():
         arg_values.queries_rev_path,
         arg_values.results_path,
         arg_values.evaluation_path,
-        arg_values.query_limit
+        arg_values.query_limit,
+        arg_values.vocabulary_cache_memory,
+        arg_values.postings_codec,
+        arg_values.search_mode,
+        arg_values.store_positions,
+        arg_values.workers,
+        arg_values.indexing_batch_size
     )
 
 
@@ -254,8 +394,16 @@ def print_arguments(_arguments: Arguments):
     print(f"Stopwords: {'Yes' if _arguments.stopwords is not None else 'No'}")
     print(f"Use Stemmer: {'Yes' if _arguments.use_potter_stemmer else 'No'}")
     print(f"Memory Threshold: {_arguments.memory_threshold}")
+    print(f"Block Memory: {'No' if _arguments.block_memory is None else f'{_arguments.block_memory / 1024 / 1024} MB'}")
+    print(f"Block Writer Depth: {_arguments.block_writer_depth}")
+    print(f"Merge Fan-in: {_arguments.merge_fan_in}")
+    print(f"Merge Workers: {_arguments.merge_workers}")
+    print(f"Indexing Workers: {_arguments.workers}")
+    print(f"Indexing Batch Size: {_arguments.indexing_batch_size}")
     print(f"Index Path: {_arguments.index_path}")
     print(f"Indexing Format: {_arguments.indexing_format.value}")
+    print(f"Postings Codec: {_arguments.postings_codec.value}")
+    print(f"Store Positions: {'Yes' if _arguments.store_positions else 'No'}")
     print(f"BM25 Parameters: k1={_arguments.k1} b={_arguments.b}")
     print(f"Debug Mode: {'Yes' if _arguments.debug_mode else 'No'}")
     print(f"Index Only: {'Yes' if _arguments.index_only else 'No'}")
@@ -264,3 +412,5 @@ def print_arguments(_arguments: Arguments):
     print(f"Evaluation Path: {_arguments.evaluation_path}")
     print(f"Queries Relevance Path: {_arguments.queries_rev_path}")
     print(f"Query Results Limit: {'No' if _arguments.query_limit < 1 else _arguments.query_limit}")
+    print(f"Search Mode: {_arguments.search_mode.value}")
+    print(f"Vocabulary Cache Memory: {_arguments.vocabulary_cache_memory / 1024 / 1024} MB")
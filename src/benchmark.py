@@ -0,0 +1,117 @@
+"""
+Script that measures the throughput of parts of the indexing pipeline on
+the first reviews of a corpus, comparing the current implementation with
+the one it replaced and checking that both produce the same output.
+
+Usage: python src/benchmark.py [-in corpus_path] [-n review_count] [-r repeat] {stemming,tokenizer}
+"""
+import itertools
+import time
+from argparse import ArgumentParser
+from typing import Callable, List, Set
+
+import Stemmer
+
+import processor
+from arguments import default_arguments
+from corpus import raw_review_reader
+
+
+Tokenizer = Callable[[str, int, Set[str]], List[str]]
+
+_per_word_stemmer = Stemmer.Stemmer("english")
+
+
+def _per_word_process_str(content: str, min_token_len: int, stopwords: Set[str]) -> List[str]:
+    """
+    Tokenizer as it was before the stemming cache, stemming every occurrence of every word.
+    """
+    words = processor._regex_pattern.sub(" ", content.lower()).split(" ")
+    words = [_per_word_stemmer.stemWord(word) for word in words if word not in stopwords]
+    return [word for word in words if min_token_len <= len(word) < 50]
+
+
+def _split_process_str(content: str, min_token_len: int, stopwords: Set[str]) -> List[str]:
+    """
+    Tokenizer as it was before the single pass tokenizer, replacing every non letter
+    with a space and splitting on single spaces. Doesn't stem the words.
+    """
+    words = processor._regex_pattern.sub(" ", content.lower()).split(" ")
+    words = [word for word in words if word not in stopwords and len(word) >= min_token_len]
+    return [word for word in words if min_token_len <= len(word) < 50]
+
+
+def _findall_process_str(content: str, min_token_len: int, stopwords: Set[str]) -> List[str]:
+    return processor.process_str(content, min_token_len, stopwords, processor.no_stemmer)
+
+
+def _cached_process_str() -> Tokenizer:
+    stemming_cache = processor.StemmingCache(processor._stemmer)
+
+    def process_str(content: str, min_token_len: int, stopwords: Set[str]) -> List[str]:
+        return processor.process_str(content, min_token_len, stopwords, stemming_cache.stem_words)
+
+    process_str.stemming_cache = stemming_cache
+    return process_str
+
+
+def _measure(make_tokenizer: Callable[[], Tokenizer], contents: List[str], repeat: int):
+    """
+    Each run uses a new tokenizer so that no state is carried between runs.
+    :return: tokens of every content, the best time out of 'repeat' runs and the last tokenizer.
+    """
+    best_time = float("inf")
+    tokens = []
+    tokenize = None
+
+    for _ in range(repeat):
+        tokenize = make_tokenizer()
+        start_time = time.perf_counter()
+        tokens = [tokenize(content, default_arguments["min_token_length"], default_arguments["stopwords"])
+                  for content in contents]
+        best_time = min(best_time, time.perf_counter() - start_time)
+
+    return tokens, best_time, tokenize
+
+
+def _compare(name: str, make_before: Callable[[], Tokenizer], make_after: Callable[[], Tokenizer],
+             contents: List[str], repeat: int) -> Tokenizer:
+    before_tokens, before_time, _ = _measure(make_before, contents, repeat)
+    after_tokens, after_time, after_tokenizer = _measure(make_after, contents, repeat)
+    token_count = sum(len(tokens) for tokens in before_tokens)
+
+    print(f"[benchmark]: {name} on {len(contents)} reviews, {token_count} tokens")
+    print(f"Before: {token_count / before_time:.0f} tokens/s")
+    print(f"After: {token_count / after_time:.0f} tokens/s")
+    print(f"Speedup: {before_time / after_time:.2f}x")
+    print(f"Same Tokens: {'Yes' if before_tokens == after_tokens else 'No'}")
+    return after_tokenizer
+
+
+def benchmark_stemming(contents: List[str], repeat: int):
+    tokenizer = _compare("stemming", lambda: _per_word_process_str, _cached_process_str, contents, repeat)
+    print(f"Stemming cache {tokenizer.stemming_cache.statistics()}")
+
+
+def benchmark_tokenizer(contents: List[str], repeat: int):
+    _compare("tokenizer", lambda: _split_process_str, lambda: _findall_process_str, contents, repeat)
+
+
+benchmarks = {
+    "stemming": benchmark_stemming,
+    "tokenizer": benchmark_tokenizer
+}
+
+arg_parser = ArgumentParser(description="Measure the throughput of the indexing pipeline.")
+arg_parser.add_argument("benchmark", choices=benchmarks.keys())
+arg_parser.add_argument("-in", "--corpus-path", dest="corpus_path", default=default_arguments["corpus_path"])
+arg_parser.add_argument("-n", "--review-count", dest="review_count", type=int, default=20000)
+arg_parser.add_argument("-r", "--repeat", dest="repeat", type=int, default=3)
+
+
+if __name__ == "__main__":
+    arg_values = arg_parser.parse_args()
+    reviews = itertools.islice(raw_review_reader(arg_values.corpus_path), arg_values.review_count)
+    review_contents = [content for _, _, content in reviews]
+
+    benchmarks[arg_values.benchmark](review_contents, arg_values.repeat)
@@ -0,0 +1,107 @@
+"""
+Script that sends queries to the search server and prints their results
+and latencies. The queries are spread over a number of connections sent
+at the same time, to check how the server copes with concurrent clients.
+
+Usage: python src/client.py [-host host] [-port port] [-unix socket_path] [-qp queries_path] [-c connections]
+                            [query ...]
+"""
+import asyncio
+import json
+import time
+from argparse import ArgumentParser
+from statistics import mean, median
+from typing import List, Tuple
+
+
+async def _open_connection(arg_values):
+    if arg_values.unix_path is not None:
+        return await asyncio.open_unix_connection(arg_values.unix_path)
+
+    return await asyncio.open_connection(arg_values.host, arg_values.port)
+
+
+async def _send_queries(arg_values, queries: List[str]) -> List[Tuple[str, dict, float]]:
+    """
+    Sends the queries one after the other through a single connection.
+    :return: query, response and round trip time of each query.
+    """
+    reader, writer = await _open_connection(arg_values)
+    responses = []
+
+    try:
+        for query_idx, query in enumerate(queries):
+            start_time = time.perf_counter()
+            writer.write(json.dumps({"query": query, "k": arg_values.results_limit}).encode("utf-8") + b"\n")
+            await writer.drain()
+            response_line = await reader.readline()
+
+            if len(response_line) == 0:
+                # The server closed the connection, the queries left can't be sent
+                responses.extend(
+                    (unsent_query, {"error": "Connection closed by the server"}, time.perf_counter() - start_time)
+                    for unsent_query in queries[query_idx:]
+                )
+                break
+
+            responses.append((query, json.loads(response_line), time.perf_counter() - start_time))
+    finally:
+        writer.close()
+        await writer.wait_closed()
+
+    return responses
+
+
+async def run_client(arg_values, queries: List[str]):
+    connections = min(arg_values.connections, len(queries))
+    start_time = time.perf_counter()
+    responses = [
+        response
+        for connection_responses in await asyncio.gather(*(
+            _send_queries(arg_values, queries[connection::connections]) for connection in range(connections)
+        ))
+        for response in connection_responses
+    ]
+    total_time = time.perf_counter() - start_time
+
+    for query, response, round_trip in responses:
+        if "error" in response:
+            print(f"[client]: '{query}' failed: {response['error']}")
+            continue
+
+        print(f"[client]: '{query}' {len(response['results'])} results, "
+              f"search {response['latency'] * 1000:.2f} ms, round trip {round_trip * 1000:.2f} ms")
+
+        for review_id, score in response["results"][:arg_values.shown_results]:
+            print(f"{review_id:>20}  {score:>20}")
+
+    latencies = [response["latency"] for _, response, _ in responses if "error" not in response]
+    round_trips = [round_trip for _, response, round_trip in responses if "error" not in response]
+
+    if len(latencies) > 0:
+        print(f"Queries: {len(responses)} over {connections} connections in {total_time:.3f} s")
+        print(f"Search Latency: mean {mean(latencies) * 1000:.2f} ms, median {median(latencies) * 1000:.2f} ms")
+        print(f"Round Trip: mean {mean(round_trips) * 1000:.2f} ms, median {median(round_trips) * 1000:.2f} ms")
+
+
+arg_parser = ArgumentParser(description="Send queries to the search server.")
+arg_parser.add_argument("queries", nargs="*")
+arg_parser.add_argument("-host", "--host", dest="host", default="127.0.0.1")
+arg_parser.add_argument("-port", "--port", dest="port", type=int, default=8642)
+arg_parser.add_argument("-unix", "--unix-socket", dest="unix_path", default=None)
+arg_parser.add_argument("-qp", "--queries-path", dest="queries_path", default=None)
+arg_parser.add_argument("-k", "--results-limit", dest="results_limit", type=int, default=10)
+arg_parser.add_argument("-c", "--connections", dest="connections", type=int, default=1)
+arg_parser.add_argument("-s", "--shown-results", dest="shown_results", type=int, default=3)
+
+
+if __name__ == "__main__":
+    arg_values = arg_parser.parse_args()
+    queries = list(arg_values.queries)
+
+    if arg_values.queries_path is not None:
+        with open(arg_values.queries_path, encoding="utf-8") as queries_file:
+            queries.extend(query.strip() for query in queries_file if len(query.strip()) > 0)
+
+    if len(queries) > 0:
+        asyncio.run(run_client(arg_values, queries))
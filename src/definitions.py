@@ -1,17 +1,34 @@
 from dataclasses import dataclass
 from enum import Enum
 from typing import (
-    DefaultDict, Tuple, Set, TypedDict,
-    List, Callable, Dict, Generator, Iterable, TextIO
+    Tuple, Set, TypedDict,
+    Any, List, Callable, Dict, Generator, Iterable, Optional, Sequence
 )
 
 
 class IndexingFormat(Enum):
     TF_IDF = "tf_idf"
     BM25 = "bm25"
+    BM25_TF = "bm25_tf"  # stores the term frequencies, BM25 weights are computed while searching
     NO_INDEX = "none"
 
 
+class SearchMode(Enum):
+    EXHAUSTIVE = "exhaustive"
+    MAX_SCORE = "maxscore"
+
+
+class PostingsCodec(Enum):
+    TEXT = "text"
+    VBYTE = "vbyte"
+
+
+class PositionsStorage(Enum):
+    INLINE = "inline"  # inside the postings, only read from indexes created before positions were separated
+    SEPARATE = "separate"
+    NONE = "none"
+
+
 @dataclass
 class IndexingStatistics:
     indexing_time: float
@@ -19,6 +36,20 @@ class IndexingStatistics:
     term_count: int
     review_count: int
     blocks_used: int
+    blocks_size_on_disk: int
+    largest_block_size: int
+    posting_count: int
+    postings_size_on_disk: int
+    positions_size_on_disk: int
+
+
+@dataclass
+class PruningStatistics:
+    queries: int = 0
+    postings_scored: int = 0
+    postings_skipped: int = 0
+    blocks_decoded: int = 0
+    blocks_skipped: int = 0
 
 
 Path = str
@@ -45,19 +76,20 @@ ProcessedReview = Tuple[DocId, ReviewId, TermPostings, Length]
 ProcessedQuery = Tuple[Length, TermIndex]
 
 Processor = Callable[[RawReview], ProcessedReview]
-StemmerFunction = Callable[[str], str]
+StemmerFunction = Callable[[List[str]], List[str]]
 WeightFunction = Callable[[TermIndex], TermPostings]
 
 # Inverted Dictionary data types
 Postings = List[Tuple[DocId, Weight, List[Position]]]
-Vocabulary = DefaultDict[Term, Postings]
 TermPostingsEntry = Tuple[Term, Postings]
+# term, posting count and the postings of the term in parts, in doc id order
+MergedPostingsEntry = Tuple[Term, int, Iterable[Postings]]
 
 # Store data types
-PostsFormat = Callable[[Path, List[Postings], ...], Tuple]
-VocabFormat = Callable[[Path, List[Term], ...], None]
-SegmentFormat = Callable[[str, str, List[TermPostingsEntry]], None]
-Block = Tuple[Term, DocId, Postings, TextIO]
+TermWeigher = Callable[[Sequence[DocId], Sequence[Weight]], Sequence[Weight]]
+TermWeighting = Callable[[int], Tuple[float, TermWeigher]]  # idf and weigher of a term out of its posting count
+SegmentFormat = Callable[[Path, Optional[Path]], Any]  # opens the PostingsWriter of a segment
+Block = Tuple[Term, DocId, int, Postings, Any]  # the last element is the BlockReader of the block
 
 
 @dataclass
@@ -69,6 +101,9 @@ class IndexProperties:
     min_token_length: int
     stopwords: Set[str]  # a string of words separated by commas
     stemmer: StemmerFunction
+    postings_codec: PostingsCodec  # is a string on disk, indexes without it use the text codec
+    positions_storage: PositionsStorage  # is a string on disk, indexes without it have the positions inline
+    avg_document_length: Optional[float]  # None for indexes created before it was stored
 
 
 class IndexPropsDict(TypedDict):
@@ -79,15 +114,21 @@ class IndexPropsDict(TypedDict):
     min_token_length: int
     stopwords: List[str]  # a string of words separated by commas
     stemmer: str
+    postings_codec: str
+    positions_storage: str
+    avg_document_length: float
 
 
 # Searching data types
 Idf = float
 Offset = int
 PostingLen = int
+DocFrequency = int
+MaxWeight = float
 
 Segment = Tuple[Term, Term, Path]
 IdfMetadata = Tuple[Path, Idf, Offset, PostingLen]
-BM25Metadata = Tuple[Path, Offset, PostingLen]
-PostingResults = Iterable[Tuple[DocId, Weight, List[Position]]]
+BM25Metadata = Tuple[Path, Offset, PostingLen, MaxWeight]
+VocabularyEntry = Tuple[Idf, Offset, PostingLen, DocFrequency, MaxWeight]
+PostingResults = Iterable[Tuple[DocId, Weight]]
 SearchResults = List[Tuple[ReviewId, float]]
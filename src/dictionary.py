@@ -2,27 +2,72 @@
 Module containing a simple helper Data Structure that handles the construction
 of an inverted dictionary.
 """
-from typing import List
+import sys
+from array import array
+from typing import Dict, Generator, List, Tuple
 from definitions import (
     ProcessedReview,
-    ReviewId, Vocabulary, Postings,
+    ReviewId, Term,
 )
 
-from collections import defaultdict
+# Estimated bytes of a new term: its string, its two empty arrays,
+# its slots in the lists and its entry in the term ids dict.
+_TERM_BYTES = 2 * sys.getsizeof(array("I")) + 3 * 8 + 104
 
-
-def _postings() -> Postings:
-    return []
+# Arrays grow in steps of about one eighth of their size
+_GROWTH_FACTOR = 1.125
 
 
 class PostingsDictionary:
     def __init__(self):
+        """
+        Accumulates the postings of the documents of a block. Terms are
+        interned to integer ids and the postings of each term are appended
+        to two typed arrays, so a posting costs a few machine words instead
+        of a tuple, a list and an object for each of its numbers.
+        The doc entries array of a term holds the doc id, the positions count
+        and the positions of each posting, and its weights array the weights.
+        'size_in_bytes' keeps an estimate of the memory held by the dictionary,
+        which decides when a block is flushed.
+        """
         self.review_ids: List[ReviewId] = []
-        self.postings_list: Vocabulary = defaultdict(_postings)
+        self.term_ids: Dict[Term, int] = {}
+        self.terms: List[Term] = []
+        self.doc_entries: List[array] = []
+        self.weights: List[array] = []
+        self.posting_count = 0
+        self.size_in_bytes = 0
 
     def add_document(self, review: ProcessedReview):
         doc_id, review_id, postings, _ = review
         self.review_ids.append(review_id)
+        self.posting_count += len(postings)
+        size_in_bytes = sys.getsizeof(review_id) + 8
 
         for term, (weight, positions) in postings.items():
-            self.postings_list[term].append((doc_id, weight, positions))
+            term_id = self.term_ids.get(term)
+
+            if term_id is None:
+                term_id = len(self.terms)
+                self.term_ids[term] = term_id
+                self.terms.append(term)
+                self.doc_entries.append(array("I"))
+                self.weights.append(array("d"))
+                size_in_bytes += _TERM_BYTES + sys.getsizeof(term)
+
+            doc_entries = self.doc_entries[term_id]
+            doc_entries.append(doc_id)
+            doc_entries.append(len(positions))
+            doc_entries.extend(positions)
+            self.weights[term_id].append(weight)
+            size_in_bytes += (16 + 4 * len(positions)) * _GROWTH_FACTOR
+
+        self.size_in_bytes += int(size_in_bytes)
+
+    def sorted_postings(self) -> Generator[Tuple[Term, array, array], None, None]:
+        """
+        Iterates through the postings in term order.
+        :return: term, doc entries array and weights array of each term.
+        """
+        for term_id in sorted(range(len(self.terms)), key=self.terms.__getitem__):
+            yield self.terms[term_id], self.doc_entries[term_id], self.weights[term_id]
@@ -1,35 +1,45 @@
 import time
+from array import array
 
 from arguments import Arguments
 from corpus import raw_review_reader
-from definitions import IndexingStatistics, IndexingFormat
-from indexing.processing import bm_25_review_processor, index_reviews, merge_bm25_blocks, tf_idf_review_processor, \
-    merge_tf_idf_blocks
-from store import idxprops, index
+from definitions import IndexingStatistics, IndexingFormat, PositionsStorage
+from indexing.processing import bm_25_review_processor, index_reviews, index_reviews_parallel, merge_bm25_blocks, \
+    merge_bm25_tf_blocks, tf_idf_review_processor, merge_tf_idf_blocks
+from store import idxprops, index, reviews
 from store.index import IndexDirectory
-from utils import MemoryChecker
+from store.postings import POSITIONS_FILE_NAMES, POSTINGS_FILE_NAMES
+from utils import BlockMemoryChecker, MemoryChecker
 
 
-def get_processor(_arguments: Arguments):
+def get_processor_factory(_arguments: Arguments):
     if _arguments.indexing_format == IndexingFormat.TF_IDF:
-        return tf_idf_review_processor(_arguments)
+        return tf_idf_review_processor
     else:
-        return bm_25_review_processor(_arguments)
+        return bm_25_review_processor
+
+
+def get_processor(_arguments: Arguments):
+    return get_processor_factory(_arguments)(_arguments)
 
 
-def merge_blocks(document_lengths: list[int], index_dir: IndexDirectory, _arguments: Arguments):
+def merge_blocks(document_lengths: array, avg_document_length: float, index_dir: IndexDirectory, _arguments: Arguments):
     if _arguments.indexing_format == IndexingFormat.TF_IDF:
         return merge_tf_idf_blocks(document_lengths, index_dir, _arguments)
+    elif _arguments.indexing_format == IndexingFormat.BM25_TF:
+        return merge_bm25_tf_blocks(document_lengths, index_dir, _arguments)
     else:
-        return merge_bm25_blocks(document_lengths, index_dir, _arguments)
+        return merge_bm25_blocks(document_lengths, avg_document_length, index_dir, _arguments)
 
 
 def create_index(_arguments: Arguments) -> IndexingStatistics:
 
     review_reader = raw_review_reader(_arguments.corpus_path)
-    review_processor = get_processor(_arguments)
-    memory_checker = MemoryChecker(_arguments.memory_threshold)
-    index_directory = IndexDirectory(_arguments.index_path)
+    index_directory = IndexDirectory(
+        _arguments.index_path,
+        postings_file_name=POSTINGS_FILE_NAMES[_arguments.postings_codec],
+        positions_file_name=POSITIONS_FILE_NAMES[_arguments.postings_codec] if _arguments.store_positions else None
+    )
 
     if _arguments.debug_mode:
         index_directory.create(index.IndexCreationOptions.IF_EXISTS_OVERWRITE)
@@ -38,14 +48,38 @@ def create_index(_arguments: Arguments) -> IndexingStatistics:
 
     index_start_time = time.time()
 
-    document_lengths = index_reviews(review_reader, review_processor, index_directory, memory_checker)
-    review_count, term_count, index_size = merge_blocks(document_lengths, index_directory, _arguments)
+    if _arguments.workers > 1:
+        document_lengths = index_reviews_parallel(
+            review_reader, get_processor_factory(_arguments), index_directory, _arguments
+        )
+    else:
+        if _arguments.block_memory is not None:
+            memory_checker = BlockMemoryChecker(_arguments.block_memory)
+        else:
+            memory_checker = MemoryChecker(_arguments.memory_threshold)
+
+        document_lengths = index_reviews(
+            review_reader, get_processor(_arguments), index_directory, memory_checker, _arguments.block_writer_depth
+        )
+
+    reviews.write_review_id_order(index_directory.review_ids_path, index_directory.review_id_order_path)
+
+    avg_document_length = sum(document_lengths) / len(document_lengths)
+
+    # Blocks are deleted by the merge
+    block_sizes = index_directory.block_sizes()
+    review_count, term_count, posting_count, index_size = merge_blocks(
+        document_lengths, avg_document_length, index_directory, _arguments
+    )
 
     idxprops.write_props(
         index_directory.idx_props_path, _arguments.indexing_format,
         index_size, term_count, review_count,
         _arguments.min_token_length, _arguments.stopwords,
-        _arguments.use_potter_stemmer
+        _arguments.use_potter_stemmer,
+        _arguments.postings_codec,
+        PositionsStorage.SEPARATE if _arguments.store_positions else PositionsStorage.NONE,
+        avg_document_length
     )
 
     index_end_time = time.time()
@@ -55,5 +89,10 @@ def create_index(_arguments: Arguments) -> IndexingStatistics:
         index_size,
         term_count,
         review_count,
-        index_directory.block_count
+        len(block_sizes),
+        sum(block_sizes),
+        max(block_sizes),
+        posting_count,
+        index_directory.postings_size(),
+        index_directory.positions_size()
     )
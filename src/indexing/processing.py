@@ -2,17 +2,22 @@
 Module containing utility functions used during the indexing pipeline.
 """
 import gc
-import statistics
+import itertools
+import multiprocessing
+from array import array
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, List, Optional, Tuple, Union
 
 import processor
 from arguments import Arguments
-from store.segments import BufferedSegmentWriter
-from definitions import SegmentFormat, Processor, RawReviewReader
+from store.segments import SegmentWriter
+from definitions import SegmentFormat, Processor, RawReview, RawReviewReader, Term
 from dictionary import PostingsDictionary
-from store import blocks, segments, reviews
+from store import blocks, doclengths, segments, reviews
 from store.blocks import blocks_iterator
 from store.index import IndexDirectory
-from utils import MemoryChecker
+from utils import BlockMemoryChecker, MemoryChecker
 
 
 def tf_idf_review_processor(_arguments: Arguments):
@@ -39,7 +44,8 @@ def index_reviews(
         review_reader: RawReviewReader,
         review_processor: Processor,
         index_directory: IndexDirectory,
-        memory_checker: MemoryChecker
+        memory_checker: Union[MemoryChecker, BlockMemoryChecker],
+        block_writer_depth: int = 0
 ):
     """
     Utility function that contains the logic for indexing the reviews
@@ -47,46 +53,165 @@ def index_reviews(
     :param review_reader:
     :param review_processor:
     :param index_directory:
-    :param memory_checker:
+    :param memory_checker: Decides when the block in memory is written.
+    :param block_writer_depth: Number of full blocks that may be waiting
+    for or being written by the background block writer while the reviews
+    keep being indexed. When 0 blocks are written before indexing the next review.
     :return:
     """
     print("[processing]: Indexing reviews into blocks.")
     postings_dictionary = PostingsDictionary()
-    document_lengths = []
+    document_lengths = array("I")
 
-    for review in review_reader:
-        processed_review = review_processor(review)
-        _, _, _, document_length = processed_review
-        postings_dictionary.add_document(processed_review)
-        document_lengths.append(document_length)
+    with _block_writer(block_writer_depth) as write_block:
+        for review in review_reader:
+            processed_review = review_processor(review)
+            _, _, _, document_length = processed_review
+            postings_dictionary.add_document(processed_review)
+            document_lengths.append(document_length)
+
+            if memory_checker.has_reached_threshold(postings_dictionary):
+                write_block(index_directory.get_block_path(), postings_dictionary)
+                reviews.write_review_ids(
+                    index_directory.review_ids_path, index_directory.review_offsets_path, postings_dictionary.review_ids
+                )
+                postings_dictionary = PostingsDictionary()
 
-        if memory_checker.has_reached_threshold():
-            blocks.write_block(index_directory.get_block_path(), postings_dictionary.postings_list)
-            reviews.write_review_ids(index_directory.review_ids_path, postings_dictionary.review_ids)
-            postings_dictionary = PostingsDictionary()
-            collect_garbage()
+                # A block handed off to a background writer is only released once the writer is
+                # joined, so collecting would stall the loop without freeing it
+                if block_writer_depth == 0:
+                    collect_garbage()
+
+        write_block(index_directory.get_block_path(), postings_dictionary)
+        reviews.write_review_ids(
+            index_directory.review_ids_path, index_directory.review_offsets_path, postings_dictionary.review_ids
+        )
+        postings_dictionary = None
 
-    blocks.write_block(index_directory.get_block_path(), postings_dictionary.postings_list)
-    reviews.write_review_ids(index_directory.review_ids_path, postings_dictionary.review_ids)
-    postings_dictionary = None
     collect_garbage()
 
     print("[processing]: Done indexing.")
     return document_lengths
 
 
-def merge_tf_idf_blocks(document_lengths: list[int], index_dir: IndexDirectory, _arguments: Arguments):
+# Review processor of each worker process of the parallel indexing
+_worker_review_processor: Optional[Processor] = None
+
+
+def _init_worker(processor_factory: Callable[[Arguments], Processor], _arguments: Arguments):
+    global _worker_review_processor
+    _worker_review_processor = processor_factory(_arguments)
+
+
+def _index_batch(block_path: str, raw_reviews: List[RawReview]):
+    """
+    Indexes a batch of reviews into its own block. Runs in a worker process.
+    :param block_path:
+    :param raw_reviews:
+    :return: review ids and document lengths of the batch in doc id order,
+    and the stemming cache hits and misses of the batch.
+    """
+    postings_dictionary = PostingsDictionary()
+    document_lengths = array("I")
+    stemming_hits, stemming_misses = processor.stemming_cache.hits, processor.stemming_cache.misses
+
+    for review in raw_reviews:
+        processed_review = _worker_review_processor(review)
+        postings_dictionary.add_document(processed_review)
+        document_lengths.append(processed_review[3])
+
+    _write_block(block_path, postings_dictionary)
+    return (
+        postings_dictionary.review_ids,
+        document_lengths,
+        processor.stemming_cache.hits - stemming_hits,
+        processor.stemming_cache.misses - stemming_misses
+    )
+
+
+def index_reviews_parallel(
+        review_reader: RawReviewReader,
+        processor_factory: Callable[[Arguments], Processor],
+        index_directory: IndexDirectory,
+        _arguments: Arguments
+):
+    """
+    Parallel version of 'index_reviews'. The reviews are read in batches
+    of 'indexing_batch_size' which are indexed by a pool of 'workers'
+    processes, each batch into its own block. Every block holds a range
+    of consecutive doc ids and the merge concatenates postings in doc id
+    order, so the final index is the same as the one of 'index_reviews'.
+    At most two batches per worker are in flight at any time.
+    :param review_reader:
+    :param processor_factory: Module level function creating the review
+    processor out of the arguments, since the processor itself can't be
+    sent to the workers.
+    :param index_directory:
+    :param _arguments:
+    :return:
+    """
+    print(f"[processing]: Indexing reviews into blocks with {_arguments.workers} workers.")
+    document_lengths = array("I")
+    pending_batches = deque()
+
+    def collect_batch():
+        review_ids, batch_document_lengths, stemming_hits, stemming_misses = pending_batches.popleft().get()
+        reviews.write_review_ids(index_directory.review_ids_path, index_directory.review_offsets_path, review_ids)
+        document_lengths.extend(batch_document_lengths)
+        # The stemming happens in the workers, their statistics are added to the ones of this process
+        processor.stemming_cache.hits += stemming_hits
+        processor.stemming_cache.misses += stemming_misses
+
+    with multiprocessing.Pool(_arguments.workers, _init_worker, (processor_factory, _arguments)) as pool:
+        while True:
+            batch = list(itertools.islice(review_reader, _arguments.indexing_batch_size))
+
+            if len(batch) == 0:
+                break
+
+            pending_batches.append(pool.apply_async(_index_batch, (index_directory.get_block_path(), batch)))
+
+            if len(pending_batches) >= 2 * _arguments.workers:
+                collect_batch()
+
+        while len(pending_batches) != 0:
+            collect_batch()
+
+    print("[processing]: Done indexing.")
+    return document_lengths
+
+
+def merge_tf_idf_blocks(document_lengths: array, index_dir: IndexDirectory, _arguments: Arguments):
     review_count = len(document_lengths)
-    segment_format = segments.tf_idf_format(review_count)
+    segment_format = segments.tf_idf_format(review_count, _arguments.postings_codec)
 
-    term_count = merge_blocks(index_dir, segment_format, _arguments.debug_mode)
+    term_count, posting_count = merge_blocks(
+        index_dir, segment_format, _arguments.merge_fan_in, _arguments.merge_workers, _arguments.debug_mode
+    )
     index_size = index_dir.index_size()
 
-    return review_count, term_count, index_size
+    return review_count, term_count, posting_count, index_size
 
 
-def merge_bm25_blocks(document_lengths: list[int], index_dir: IndexDirectory, _arguments: Arguments):
-    avg_document_length = statistics.mean(document_lengths)
+def merge_bm25_tf_blocks(document_lengths: array, index_dir: IndexDirectory, _arguments: Arguments):
+    review_count = len(document_lengths)
+    segment_format = segments.bm25_tf_format(review_count, _arguments.postings_codec)
+
+    doclengths.write_document_lengths(index_dir.document_lengths_path, document_lengths)
+    term_count, posting_count = merge_blocks(
+        index_dir, segment_format, _arguments.merge_fan_in, _arguments.merge_workers, _arguments.debug_mode
+    )
+    index_size = index_dir.index_size()
+
+    return review_count, term_count, posting_count, index_size
+
+
+def merge_bm25_blocks(
+        document_lengths: array,
+        avg_document_length: float,
+        index_dir: IndexDirectory,
+        _arguments: Arguments
+):
     review_count = len(document_lengths)
 
     segment_format = segments.bm25_format(
@@ -94,36 +219,228 @@ def merge_bm25_blocks(document_lengths: list[int], index_dir: IndexDirectory, _a
         avg_document_length,
         document_lengths,
         _arguments.b,
-        _arguments.k1
+        _arguments.k1,
+        _arguments.postings_codec
     )
 
-    term_count = merge_blocks(index_dir, segment_format, _arguments.debug_mode)
+    term_count, posting_count = merge_blocks(
+        index_dir, segment_format, _arguments.merge_fan_in, _arguments.merge_workers, _arguments.debug_mode
+    )
     index_size = index_dir.index_size()
 
-    return review_count, term_count, index_size
+    return review_count, term_count, posting_count, index_size
 
 
-def merge_blocks(index_directory: IndexDirectory, segment_format: SegmentFormat, debug_mode: bool):
+def merge_blocks(
+        index_directory: IndexDirectory,
+        segment_format: SegmentFormat,
+        fan_in: int,
+        merge_workers: int,
+        debug_mode: bool
+):
     """
     Utility function that merges the block files into the final index.
+    While there are more than 'fan_in' blocks, the blocks are merged in
+    groups into fewer and larger blocks, so that no pass has more than
+    'fan_in' blocks open at once.
     :param index_directory:
     :param segment_format:
+    :param fan_in: Maximum number of blocks merged at once.
+    :param merge_workers: Number of processes merging the last pass, each
+    of them a range of terms into its own segments.
     :param debug_mode
     :return:
     """
     print("[processing]: Merging blocks into final index")
-    segment_writer = BufferedSegmentWriter(segment_format, index_directory)
+    merge_pass = 1
 
-    for entry in blocks_iterator(index_directory.block_paths):
-        segment_writer.write(entry)
+    while index_directory.block_count > fan_in:
+        _merge_pass(index_directory, merge_pass, fan_in, debug_mode)
+        merge_pass += 1
 
-    segment_writer.flush()
+    bytes_read = sum(index_directory.block_sizes())
+
+    if merge_workers > 1 and "fork" in multiprocessing.get_all_start_methods():
+        term_count, posting_count = _merge_term_ranges(index_directory, segment_format, merge_workers)
+    else:
+        _, term_count, posting_count = _merge_term_range(index_directory, segment_format, None, None)
+
+    _print_merge_pass(merge_pass, index_directory.block_count, "the index", bytes_read, index_directory.segments_size())
 
     if not debug_mode:
         index_directory.delete_blocks_dir()
 
     print("[processing]: Done merging.")
-    return segment_writer.term_count
+    return term_count, posting_count
+
+
+def _merge_term_range(
+        index_directory: IndexDirectory,
+        segment_format: SegmentFormat,
+        start_term: Optional[Term],
+        end_term: Optional[Term]
+):
+    """
+    Merges the postings of the terms from 'start_term' up to 'end_term'
+    into their own segments. Without a start or end term the range is
+    open on that side.
+    :param index_directory:
+    :param segment_format:
+    :param start_term:
+    :param end_term:
+    :return: paths of the written segments, term count and posting count.
+    """
+    segment_writer = SegmentWriter(segment_format, index_directory)
+    segment_count = index_directory.segment_count
+
+    for term, posting_count, l_postings in blocks_iterator(index_directory.block_paths, start_term, end_term):
+        segment_writer.write(term, posting_count, l_postings)
+
+    segment_writer.flush()
+    return index_directory.segment_paths[segment_count:], segment_writer.term_count, segment_writer.posting_count
+
+
+# Index directory and segment format of each process of the parallel merge
+_merge_index_directory: Optional[IndexDirectory] = None
+_merge_segment_format: Optional[SegmentFormat] = None
+
+
+def _init_merge_worker(index_directory: IndexDirectory, segment_format: SegmentFormat):
+    global _merge_index_directory, _merge_segment_format
+    _merge_index_directory = index_directory
+    _merge_segment_format = segment_format
+
+
+def _merge_worker_range(term_range: Tuple[Optional[Term], Optional[Term]]):
+    start_term, end_term = term_range
+    print(f"[processing]: Merging terms from '{start_term or ''}' to '{end_term or ''}'")
+    return _merge_term_range(_merge_index_directory, _merge_segment_format, start_term, end_term)
+
+
+def _merge_term_ranges(index_directory: IndexDirectory, segment_format: SegmentFormat, merge_workers: int):
+    """
+    Merges the blocks with a process per range of terms. The split terms
+    are chosen out of the frame indexes of the blocks so that the ranges
+    hold about the same amount of postings. The processes are forked, so
+    they inherit the segment format with its document lengths instead of
+    receiving a copy of it, and each one writes the segments of its range.
+    :param index_directory:
+    :param segment_format:
+    :param merge_workers:
+    :return: term count and posting count.
+    """
+    splits = blocks.term_range_splits(index_directory.block_paths, merge_workers)
+    term_ranges = list(zip([None, *splits], [*splits, None]))
+    print(f"[processing]: Merging {len(term_ranges)} term ranges with {merge_workers} workers")
+
+    fork_context = multiprocessing.get_context("fork")
+
+    with fork_context.Pool(merge_workers, _init_merge_worker, (index_directory, segment_format)) as pool:
+        range_results = pool.map(_merge_worker_range, term_ranges, chunksize=1)
+
+    term_count, posting_count = 0, 0
+
+    for segment_paths, range_term_count, range_posting_count in range_results:
+        index_directory.segment_paths.extend(segment_paths)
+        term_count += range_term_count
+        posting_count += range_posting_count
+
+    return term_count, posting_count
+
+
+def _merge_pass(index_directory: IndexDirectory, merge_pass: int, fan_in: int, debug_mode: bool):
+    """
+    Merges groups of at most 'fan_in' consecutive blocks into new blocks.
+    A group of a single block is kept as it is.
+    :param index_directory:
+    :param merge_pass:
+    :param fan_in:
+    :param debug_mode: When on the merged blocks are kept.
+    :return:
+    """
+    block_paths = list(index_directory.block_paths)
+    merged_block_paths = []
+    bytes_read, bytes_written = 0, 0
+    group_start = 0
+
+    for group_size in blocks.merge_groups(len(block_paths), fan_in):
+        group_paths = block_paths[group_start:group_start + group_size]
+        group_start += group_size
+
+        if group_size == 1:
+            merged_block_paths.extend(group_paths)
+            continue
+
+        block_path = index_directory.get_block_path()
+        group_read, group_written = blocks.merge_into_block(block_path, group_paths)
+        merged_block_paths.append(block_path)
+        bytes_read += group_read
+        bytes_written += group_written
+
+    index_directory.replace_blocks(merged_block_paths, delete=not debug_mode)
+    _print_merge_pass(merge_pass, len(block_paths), f"{len(merged_block_paths)} blocks", bytes_read, bytes_written)
+
+
+def _print_merge_pass(merge_pass: int, block_count: int, merged_into: str, bytes_read: int, bytes_written: int):
+    print(
+        f"[processing]: Merge pass {merge_pass} merged {block_count} blocks into {merged_into}, "
+        f"read {bytes_read / 1024 / 1024:.2f} MB and wrote {bytes_written / 1024 / 1024:.2f} MB"
+    )
+
+
+@contextmanager
+def _block_writer(depth: int):
+    """
+    Creates the function that writes a block. With a positive 'depth' each
+    block is sorted and written in the background by a forked process, which
+    inherits the postings dictionary instead of receiving a copy of it.
+    Handing off a block waits until fewer than 'depth' writers are running,
+    so at most 'depth' full blocks are held besides the one being filled.
+    Blocks are written synchronously where processes can't be forked.
+    All the blocks are written when the context exits.
+    :param depth:
+    :return:
+    """
+    if depth == 0 or "fork" not in multiprocessing.get_all_start_methods():
+        yield _write_block
+        return
+
+    fork_context = multiprocessing.get_context("fork")
+    running_writers = deque()
+
+    def wait_writer():
+        writer = running_writers.popleft()
+        writer.join()
+
+        if writer.exitcode != 0:
+            raise ChildProcessError(f"Block writer {writer.name} exited with code {writer.exitcode}")
+
+    def write_block(block_path: str, postings_dictionary: PostingsDictionary):
+        while len(running_writers) >= depth:
+            wait_writer()
+
+        writer = fork_context.Process(target=_write_block, args=(block_path, postings_dictionary))
+        writer.start()
+        running_writers.append(writer)
+
+    try:
+        yield write_block
+
+        while len(running_writers) != 0:
+            wait_writer()
+    finally:
+        # Writers left when indexing fails are only joined, the error is already being raised
+        for writer in running_writers:
+            writer.join()
+
+
+def _write_block(block_path: str, postings_dictionary: PostingsDictionary):
+    print(
+        f"[processing]: Block {block_path} holds {len(postings_dictionary.review_ids)} reviews, "
+        f"{postings_dictionary.posting_count} postings and {len(postings_dictionary.terms)} terms "
+        f"in about {postings_dictionary.size_in_bytes / 1024 / 1024:.2f} MB"
+    )
+    blocks.write_block(block_path, postings_dictionary)
 
 
 def collect_garbage():
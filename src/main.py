@@ -4,11 +4,13 @@ Script that is called to run the indexer, the searcher and the evaluator.
 Made by: José Gonçalves nº84967
 """
 
+import processor
 import searching
 from arguments import get_arguments, print_arguments
-from definitions import IndexingFormat, IndexingStatistics, SearchResults
+from definitions import IndexingFormat, IndexingStatistics, SearchResults, PruningStatistics
 from evaluating import Evaluator
-from store import idxprops, index, segments
+from store import index
+from store.reader import IndexReader
 from indexing import indexing
 
 import utils
@@ -21,6 +23,7 @@ def main():
     if _arguments.indexing_format != IndexingFormat.NO_INDEX:
         index_stats = indexing.create_index(_arguments)
         print_statistics(index_stats)
+        print(f"[main]: Stemming cache {processor.stemming_cache.statistics()}")
     else:
         print("[main]: Skipping indexing phase.")
 
@@ -28,29 +31,30 @@ def main():
         print(f"[main]: Searching queries in '{_arguments.queries_path}'.")
         print(f"[main]: Writing results to '{_arguments.results_path}'")
         index_directory = index.IndexDirectory(_arguments.index_path)
-        index_properties = idxprops.read_props(index_directory.idx_props_path)
-        index_segments = segments.read_segments(index_directory.segments_dir_path)
-        search_func = searching.get_searcher(
-            index_properties.idx_format,
-            index_properties.min_token_length,
-            index_properties.stopwords,
-            index_properties.stemmer,
-            index_segments,
-            index_directory.review_ids_path
-        )
         queries = read_queries_file(_arguments.queries_path)
-        evaluator = Evaluator(_arguments.queries_rev_path, search_func, _arguments.query_limit)
-
-        for query in queries:
-            # results = search_func(query)
-            results = evaluator.search(query)
-            write_results(
-                f"RESULT FOR QUERY '{query}'",
-                results,
-                _arguments.results_path
-            )
+        pruning_statistics = PruningStatistics()
 
-        evaluator.output_evaluation(_arguments.evaluation_path)
+        with IndexReader(index_directory, _arguments.vocabulary_cache_memory) as index_reader:
+            search_func = searching.get_searcher(
+                index_reader, _arguments.search_mode, pruning_statistics, _arguments.k1, _arguments.b
+            )
+            evaluator = Evaluator(_arguments.queries_rev_path, search_func, _arguments.query_limit)
+
+            for query in queries:
+                # results = search_func(query)
+                results = evaluator.search(query)
+                write_results(
+                    f"RESULT FOR QUERY '{query}'",
+                    results,
+                    _arguments.results_path
+                )
+
+            evaluator.output_evaluation(_arguments.evaluation_path)
+            print(f"[main]: Vocabulary cache {index_reader.vocabulary_cache.statistics()}")
+            print(f"[main]: Stemming cache {processor.stemming_cache.statistics()}")
+
+            if pruning_statistics.queries > 0:
+                print_pruning_statistics(pruning_statistics)
     else:
         print("[main]: Skipping Searching queries phase.")
 
@@ -59,10 +63,26 @@ def print_statistics(indexing_statistics: IndexingStatistics):
     print(f"Indexing time: {utils.format_time_interval(indexing_statistics.indexing_time)}")
     print(f"Index size: {indexing_statistics.index_size_on_disk / 1024 / 1024} MB")
     print(f"Temporary Blocks Used: {indexing_statistics.blocks_used}")
+    print(f"Temporary Blocks Size: {indexing_statistics.blocks_size_on_disk / 1024 / 1024} MB")
+    print(f"Largest Temporary Block: {indexing_statistics.largest_block_size / 1024 / 1024} MB")
     print(f"Term Count: {indexing_statistics.term_count}")
+    print(f"Posting Count: {indexing_statistics.posting_count}")
+    print(f"Postings size: {indexing_statistics.postings_size_on_disk / 1024 / 1024} MB")
+    print(f"Bytes per Posting: {indexing_statistics.postings_size_on_disk / indexing_statistics.posting_count}")
+    print(f"Positions size: {indexing_statistics.positions_size_on_disk / 1024 / 1024} MB")
     print(f"Review Count: {indexing_statistics.review_count}")
 
 
+def print_pruning_statistics(pruning_statistics: PruningStatistics):
+    total_postings = pruning_statistics.postings_scored + pruning_statistics.postings_skipped
+    print(f"Pruned Queries: {pruning_statistics.queries}")
+    print(f"Postings Scored: {pruning_statistics.postings_scored}")
+    print(f"Postings Skipped: {pruning_statistics.postings_skipped}")
+    print(f"Postings Skipped Ratio: {pruning_statistics.postings_skipped / max(total_postings, 1)}")
+    print(f"Postings Blocks Decoded: {pruning_statistics.blocks_decoded}")
+    print(f"Postings Blocks Skipped: {pruning_statistics.blocks_skipped}")
+
+
 def read_queries_file(queries_path: str):
     with open(queries_path, encoding="utf-8") as queries_file:
         return [query.strip().lower() for query in queries_file]
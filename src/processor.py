@@ -1,10 +1,12 @@
 """
 Module containing the DocumentProcessor.
 """
+import functools
+import itertools
 import math
 import Stemmer
 from collections import defaultdict
-from typing import Set, Callable, List, Dict
+from typing import Set, List, Dict
 
 from definitions import (
     RawReview, ProcessedReview, ProcessedQuery, Term, Idf,
@@ -17,11 +19,62 @@ import re
 _regex_pattern = re.compile("[^a-z]")
 _stemmer = Stemmer.Stemmer("english")
 
+STEMMING_CACHE_SIZE = 200000
+
+
+class StemmingCache:
+    def __init__(self, stemmer: Stemmer.Stemmer, max_size: int = STEMMING_CACHE_SIZE):
+        """
+        Remembers the stem of each surface form so that a word is stemmed
+        once instead of once per occurrence. The words of a document missing
+        from the cache are stemmed together with a single 'stemWords' call.
+        Once the cache holds 'max_size' words the oldest ones are evicted.
+        :param stemmer:
+        :param max_size: Maximum number of cached words.
+        """
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._stemmer = stemmer
+        self._stems: Dict[str, str] = {}
+
+    def stem_words(self, words: List[str]) -> List[str]:
+        stems = self._stems
+        missing_words = [word for word in dict.fromkeys(words) if word not in stems]
+
+        if len(missing_words) > 0:
+            overflow = min(len(stems) + len(missing_words) - self.max_size, len(stems))
+
+            if overflow > 0:
+                for word in list(itertools.islice(stems, overflow)):
+                    del stems[word]
+
+                self.evictions += overflow
+
+            stems.update(zip(missing_words, self._stemmer.stemWords(missing_words)))
+
+        self.misses += len(missing_words)
+        self.hits += len(words) - len(missing_words)
+        return [stems[word] for word in words]
+
+    def statistics(self) -> str:
+        lookups = self.hits + self.misses
+        hit_rate = self.hits / lookups if lookups > 0 else 0.0
+        return (
+            f"hits={self.hits} misses={self.misses} hit_rate={hit_rate:.2%} "
+            f"evictions={self.evictions} words={len(self._stems)}/{self.max_size}"
+        )
+
+
+# Shared by the review and the query processors of the process
+stemming_cache = StemmingCache(_stemmer)
+
 
 def query_processor(
         min_token_len: int,
         stopwords: Set[str],
-        stemmer: Callable[[str], str]
+        stemmer: StemmerFunction
 ):
     def process_query(query: str) -> ProcessedQuery:
         words = process_str(query, min_token_len, stopwords, stemmer)
@@ -53,13 +106,28 @@ def process_str(
         content: str,
         min_token_len: int,
         stopwords: Set[str],
-        stemmer: Callable[[str], str],
+        stemmer: StemmerFunction,
 ):
-    words = _regex_pattern.sub(" ", content.lower()).split(" ")
-    words = [stemmer(word) for word in words if word not in stopwords]
+    if min_token_len > 0:
+        # Stems are never longer than their words so short words are dropped before stemming
+        words = _words_pattern(min_token_len).findall(content.lower())
+    else:
+        # Without a minimum length the empty strings between consecutive separators are words too
+        words = _regex_pattern.sub(" ", content.lower()).split(" ")
+
+    words = stemmer([word for word in words if word not in stopwords])
     return [word for word in words if min_token_len <= len(word) < 50]
 
 
+@functools.lru_cache(maxsize=None)
+def _words_pattern(min_token_len: int) -> re.Pattern:
+    """
+    Pattern matching the runs of letters with at least 'min_token_len' letters.
+    Runs are delimited by non letters so each match is a whole run.
+    """
+    return re.compile(f"[a-z]{{{min_token_len},}}")
+
+
 def aggregate(words: List[str]) -> TermIndex:
     count_dict = defaultdict(list)
 
@@ -116,9 +184,9 @@ def count_term_index(term_index: TermIndex) -> TermPostings:
     return postings
 
 
-def english_stemmer(word: str):
-    return _stemmer.stemWord(word)
+def english_stemmer(words: List[str]) -> List[str]:
+    return stemming_cache.stem_words(words)
 
 
-def no_stemmer(word: str):
-    return word
+def no_stemmer(words: List[str]) -> List[str]:
+    return words
@@ -1,44 +1,82 @@
-from typing import List, Set, Dict
+import heapq
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
 from collections import defaultdict
 
 from definitions import (
-    Segment, StemmerFunction, IndexingFormat
+    IndexingFormat, Offset, Path, PostingLen, SearchResults, Weight,
+    SearchMode, PruningStatistics, MaxWeight
 )
 import processor
-from store.postings import read_postings
-from store.reviews import review_id_reader
+from store.postings import PostingsCursor
+from store.reader import IndexReader
 from store.vocabulary import tf_idf_metadata_reader, bm25_metadata_reader
 
+try:
+    import numpy as np
+except ImportError:  # numpy is optional, scores are accumulated in a dict without it
+    np = None
+
+
+# (query term weight, segment path, offset, postings length) of a query term
+WeightedTerm = Tuple[Weight, Path, Offset, PostingLen]
+
+# (segment path, offset, postings length) of the postings of a term
+PostingsLocation = Tuple[Path, Offset, PostingLen]
+
+# Queries whose postings are fewer than review_count / SPARSE_ACCUMULATOR_RATIO
+# accumulate their scores only for the documents they match instead of in
+# an accumulator with room for every review.
+SPARSE_ACCUMULATOR_RATIO = 16
+
+# Relative margin given to score upper bounds so that rounding errors
+# never prune a document that could enter the results.
+_UPPER_BOUND_SLACK = 1e-9
+
 
 def get_searcher(
-        idx_format: IndexingFormat,
-        min_token_length: int,
-        stopwords: Set[str],
-        stemmer: StemmerFunction,
-        segments: List[Segment],
-        review_ids_path: str
+        index_reader: IndexReader,
+        search_mode: SearchMode = SearchMode.EXHAUSTIVE,
+        pruning_statistics: Optional[PruningStatistics] = None,
+        k1: float = 1.2,
+        b: float = 0.75
 ):
-    if idx_format is IndexingFormat.TF_IDF:
-        return tf_idf_searcher(min_token_length, stopwords, stemmer, segments, review_ids_path)
+    """
+    :param index_reader:
+    :param search_mode: Not used by the indexes storing term frequencies,
+    which are always searched exhaustively.
+    :param pruning_statistics:
+    :param k1: Default BM25 k1 of the indexes storing term frequencies.
+    :param b: Default BM25 b of the indexes storing term frequencies.
+    :return: the search function, whose 'search_batch' attribute searches
+    many queries at once, returning the same results as searching each of them.
+    """
+    if index_reader.properties.idx_format is IndexingFormat.TF_IDF:
+        return tf_idf_searcher(index_reader)
+    elif index_reader.properties.idx_format is IndexingFormat.BM25_TF:
+        return bm25_tf_searcher(index_reader, k1, b)
+    elif search_mode is SearchMode.MAX_SCORE:
+        return bm25_max_score_searcher(index_reader, pruning_statistics)
     else:
-        return bm25_searcher(min_token_length, stopwords, stemmer, segments, review_ids_path)
+        return bm25_searcher(index_reader)
 
 
-def tf_idf_searcher(
-        min_token_length: int,
-        stopwords: Set[str],
-        stemmer: StemmerFunction,
-        segments: List[Segment],
-        review_ids_path: str
-):
-    process_query = processor.query_processor(min_token_length, stopwords, stemmer)
-    read_tf_idf_meta = tf_idf_metadata_reader(segments)
-    retrieve_review_ids = _review_ids_retriever(review_ids_path)
+def _query_processor(index_reader: IndexReader):
+    index_properties = index_reader.properties
+    return processor.query_processor(
+        index_properties.min_token_length,
+        index_properties.stopwords,
+        index_properties.stemmer
+    )
 
-    def search(query: str, results_limit=100):
+
+def tf_idf_searcher(index_reader: IndexReader):
+    process_query = _query_processor(index_reader)
+    read_tf_idf_meta = tf_idf_metadata_reader(index_reader.segments, index_reader.vocabulary_cache)
+    score_terms = _terms_scorer(index_reader)
+
+    def weigh_terms(query: str) -> List[WeightedTerm]:
         _, term_index = process_query(query)
         terms_metadata = {}
-        scores: Dict[int, float] = defaultdict(float)
 
         for term in term_index:
             term_metadata = read_tf_idf_meta(term)
@@ -50,63 +88,485 @@ def tf_idf_searcher(
             {term: idf for term, (_, idf, _, _) in terms_metadata.items()}
         )
 
+        weighted_terms = []
+
         for term, (term_weight, _) in term_weights.items():
             segment_path, _, offset, post_len = terms_metadata[term]
-            postings = read_postings(segment_path, offset, post_len)
+            weighted_terms.append((term_weight, segment_path, offset, post_len))
 
-            for doc_id, doc_weight, _ in postings:
-                scores[doc_id] += term_weight * doc_weight
+        return weighted_terms
 
-        return retrieve_review_ids(scores, results_limit)
+    def search(query: str, results_limit=100):
+        return score_terms(weigh_terms(query), results_limit)
 
+    search.search_batch = _batch_terms_searcher(index_reader, weigh_terms, score_terms)
     return search
 
 
-def bm25_searcher(
-        min_token_length: int,
-        stopwords: Set[str],
-        stemmer: StemmerFunction,
-        segments: List[Segment],
-        review_ids_path: str
-):
-    process_query = processor.query_processor(min_token_length, stopwords, stemmer)
-    read_bm25_meta = bm25_metadata_reader(segments)
-    retrieve_review_ids = _review_ids_retriever(review_ids_path)
+def bm25_searcher(index_reader: IndexReader):
+    process_query = _query_processor(index_reader)
+    read_bm25_meta = bm25_metadata_reader(index_reader.segments, index_reader.vocabulary_cache)
+    score_terms = _terms_scorer(index_reader)
 
-    def search(query: str, results_limit=100):
+    def weigh_terms(query: str) -> List[WeightedTerm]:
         _, term_index = process_query(query)
-        terms_metadata = {}
+        weighted_terms = []
+
+        for term in term_index:
+            term_metadata = read_bm25_meta(term)
+            if term_metadata is not None:
+                segment_path, offset, post_len, _ = term_metadata
+                weighted_terms.append((1.0, segment_path, offset, post_len))
+
+        return weighted_terms
+
+    def search(query: str, results_limit=100):
+        return score_terms(weigh_terms(query), results_limit)
+
+    search.search_batch = _batch_terms_searcher(index_reader, weigh_terms, score_terms)
+    return search
+
+
+def bm25_tf_searcher(index_reader: IndexReader, k1: float = 1.2, b: float = 0.75):
+    """
+    BM25 searcher of the indexes storing the term frequencies instead of
+    the weights. The weights are computed while searching out of the term
+    frequencies, the idfs, the document lengths and the average document
+    length of the index, so k1 and b can be changed with each query instead
+    of creating the index again. The weights are computed like the ones of
+    a BM25 index, except that they aren't rounded to float32.
+    :param index_reader:
+    :param k1: k1 of the queries that don't give one.
+    :param b: b of the queries that don't give one.
+    :return:
+    """
+    process_query = _query_processor(index_reader)
+    read_tf_idf_meta = tf_idf_metadata_reader(index_reader.segments, index_reader.vocabulary_cache)
+    retrieve_review_ids = _review_ids_retriever(index_reader)
+    avg_dl = index_reader.properties.avg_document_length
+    default_k1, default_b = k1, b
+
+    def score_terms(terms_metadata, k1: float, b: float, read_postings=index_reader.read_postings) -> Dict[int, float]:
         scores: Dict[int, float] = defaultdict(float)
+        document_lengths = index_reader.document_lengths
+
+        for segment_path, idf, offset, post_len in terms_metadata:
+            for doc_id, tf in read_postings(segment_path, offset, post_len):
+                length_norm = k1 * (1 - b + b * (document_lengths[doc_id] / avg_dl))
+                scores[doc_id] += idf * ((k1 + 1) * tf) / (length_norm + tf)
+
+        return scores
+
+    def score_terms_arrays(terms_metadata, k1: float, b: float, read_postings=index_reader.read_postings_arrays):
+        # A view of the mapped file, not kept between queries so that the reader can be closed
+        document_lengths = index_reader.document_lengths
+        l_postings = []
+
+        for segment_path, idf, offset, post_len in terms_metadata:
+            doc_ids, tfs = read_postings(segment_path, offset, post_len)
+            length_norms = k1 * (1 - b + b * (document_lengths[doc_ids] / avg_dl))
+            l_postings.append((1.0, doc_ids, idf * ((k1 + 1) * tfs) / (length_norms + tfs)))
+
+        return _accumulate(l_postings, index_reader.properties.review_count)
+
+    def read_terms_metadata(query: str):
+        _, term_index = process_query(query)
+        terms_metadata = []
+
+        for term in term_index:
+            term_metadata = read_tf_idf_meta(term)
+            if term_metadata is not None:
+                terms_metadata.append(term_metadata)
+
+        return terms_metadata
+
+    def score_query(terms_metadata, results_limit: int, k1: Optional[float], b: Optional[float], read_postings=None):
+        k1 = default_k1 if k1 is None else k1
+        b = default_b if b is None else b
+
+        if np is None:
+            scores = score_terms(terms_metadata, k1, b, read_postings or index_reader.read_postings)
+            return retrieve_review_ids(top_k(scores, results_limit))
+
+        doc_ids, scores = score_terms_arrays(terms_metadata, k1, b, read_postings or index_reader.read_postings_arrays)
+        return retrieve_review_ids(top_k_arrays(doc_ids, scores, results_limit))
+
+    def search(query: str, results_limit=100, k1: Optional[float] = None, b: Optional[float] = None):
+        return score_query(read_terms_metadata(query), results_limit, k1, b)
+
+    def search_batch(queries: List[str], results_limit=100, k1: Optional[float] = None, b: Optional[float] = None):
+        l_terms_metadata = [read_terms_metadata(query) for query in queries]
+        read_postings = _shared_postings_reader(index_reader, (
+            (segment_path, offset, post_len)
+            for terms_metadata in l_terms_metadata
+            for segment_path, _, offset, post_len in terms_metadata
+        ))
+        return [
+            score_query(terms_metadata, results_limit, k1, b, read_postings)
+            for terms_metadata in l_terms_metadata
+        ]
+
+    search.search_batch = search_batch
+    return search
+
+
+def bm25_max_score_searcher(index_reader: IndexReader, pruning_statistics: Optional[PruningStatistics] = None):
+    """
+    BM25 searcher that scores documents one at a time using the MaxScore
+    dynamic pruning algorithm. It returns exactly the same results as
+    bm25_searcher but skips the postings of documents that can't make it
+    into the results. The number of postings scored and skipped is added to
+    'pruning_statistics'. Queries without a results limit are scored exhaustively.
+    :param index_reader:
+    :param pruning_statistics:
+    :return:
+    """
+    process_query = _query_processor(index_reader)
+    read_bm25_meta = bm25_metadata_reader(index_reader.segments, index_reader.vocabulary_cache)
+    score_terms = _terms_scorer(index_reader)
+    retrieve_review_ids = _review_ids_retriever(index_reader)
+    pruning_statistics = PruningStatistics() if pruning_statistics is None else pruning_statistics
+
+    def search(query: str, results_limit=100):
+        _, term_index = process_query(query)
+        terms_metadata = []
 
         for term in term_index:
             term_metadata = read_bm25_meta(term)
             if term_metadata is not None:
-                terms_metadata[term] = term_metadata
+                terms_metadata.append(term_metadata)
 
-        for term, (segment_path, offset, post_len) in terms_metadata.items():
-            postings = read_postings(segment_path, offset, post_len)
+        if results_limit < 1:
+            return score_terms(
+                [(1.0, segment_path, offset, post_len) for segment_path, offset, post_len, _ in terms_metadata],
+                results_limit
+            )
+
+        l_postings = [
+            (max_weight, index_reader.postings_cursor(segment_path, offset, post_len))
+            for segment_path, offset, post_len, max_weight in terms_metadata
+        ]
 
-            for doc_id, doc_weight, _ in postings:
-                scores[doc_id] += doc_weight
+        return retrieve_review_ids(max_score_top_k(l_postings, results_limit, pruning_statistics))
 
-        return retrieve_review_ids(scores, results_limit)
+    def search_batch(queries: List[str], results_limit=100) -> List[SearchResults]:
+        # Each query skips different parts of the postings, so they aren't read ahead and shared
+        return [search(query, results_limit) for query in queries]
 
+    search.search_batch = search_batch
     return search
 
 
-def _review_ids_retriever(review_ids_path: str):
-    read_review_id = review_id_reader(review_ids_path)
+def max_score_top_k(
+        l_postings: List[Tuple[MaxWeight, PostingsCursor]],
+        results_limit: int,
+        pruning_statistics: PruningStatistics
+) -> List[Tuple[float, int]]:
+    """
+    Document at a time implementation of MaxScore (Turtle and Flood, 1995).
+    Terms are sorted by their maximum weight and split into essential and
+    non essential terms. Non essential terms are the ones whose maximum weights
+    added together can't reach the score of the worst result in the heap,
+    so only documents from the essential terms are candidates and the postings
+    of the non essential ones are only looked up while a candidate can still
+    make it into the heap. The maximum weight of the postings block a
+    candidate would be in tightens that bound before the block is decoded.
+    Scores are added in query term order like in the exhaustive searchers,
+    so the results and their scores are exactly the same as top_k's.
+    :param l_postings: (maximum weight, postings cursor) of each query term in query order.
+    :param results_limit: Must be larger than 0.
+    :param pruning_statistics:
+    :return:
+    """
+    term_order = sorted(range(len(l_postings)), key=lambda term: l_postings[term][0])
+    max_weights = [l_postings[term][0] for term in term_order]
+    cursors = [l_postings[term][1] for term in term_order]
+    term_count = len(term_order)
 
-    def _retrieve_with_scores(scores: Dict[int, float], results_limit: int):
-        sorted_doc_ids = sorted(
-            ((score, doc_id) for doc_id, score in scores.items()),
-            reverse=True
-        )
-        sorted_doc_ids = sorted_doc_ids if results_limit < 1 else sorted_doc_ids[:results_limit]
+    # upper_bounds[i] is the highest score terms 0 to i can give a document together.
+    upper_bounds = []
+    upper_bound = 0.0
+    for max_weight in max_weights:
+        upper_bound += max_weight
+        upper_bounds.append(upper_bound * (1 + _UPPER_BOUND_SLACK))
+
+    heap: List[Tuple[float, int]] = []
+    threshold = -float("inf")
+    first_essential = 0
+    postings_scored = 0
+
+    while True:
+        candidate = None
+
+        for term in range(first_essential, term_count):
+            doc_id = cursors[term].doc_id
+            if doc_id is not None and (candidate is None or doc_id < candidate):
+                candidate = doc_id
+
+        if candidate is None:
+            break
+
+        contributions: List[Optional[float]] = [None] * term_count
+        partial_score = 0.0
+
+        for term in range(first_essential, term_count):
+            cursor = cursors[term]
+            if cursor.doc_id == candidate:
+                contributions[term_order[term]] = cursor.weight
+                partial_score += cursor.weight
+                cursor.next()
+                postings_scored += 1
+
+        pruned = False
+
+        for term in range(first_essential - 1, -1, -1):
+            lower_terms_bound = upper_bounds[term - 1] if term > 0 else 0.0
+            cursor = cursors[term]
+
+            if (
+                    partial_score + upper_bounds[term] < threshold or
+                    partial_score + lower_terms_bound +
+                    cursor.block_max_weight(candidate) * (1 + _UPPER_BOUND_SLACK) < threshold
+            ):
+                pruned = True
+                break
+
+            cursor.advance(candidate)
+
+            if cursor.doc_id == candidate:
+                contributions[term_order[term]] = cursor.weight
+                partial_score += cursor.weight
+                cursor.next()
+                postings_scored += 1
+
+        if pruned:
+            continue
+
+        score = 0.0
+        for contribution in contributions:
+            if contribution is not None:
+                score += contribution
+
+        # Candidates come in increasing doc id order so one with the same
+        # score as the worst result beats it on the doc id tie break.
+        if len(heap) < results_limit:
+            heapq.heappush(heap, (score, candidate))
+        elif score >= heap[0][0]:
+            heapq.heapreplace(heap, (score, candidate))
+
+        if len(heap) == results_limit:
+            threshold = heap[0][0]
+
+            while first_essential < term_count and upper_bounds[first_essential] < threshold:
+                first_essential += 1
+
+    total_postings = sum(cursor.posting_count for cursor in cursors)
+    blocks_decoded = sum(cursor.blocks_decoded for cursor in cursors)
+    pruning_statistics.queries += 1
+    pruning_statistics.postings_scored += postings_scored
+    pruning_statistics.postings_skipped += total_postings - postings_scored
+    pruning_statistics.blocks_decoded += blocks_decoded
+    pruning_statistics.blocks_skipped += sum(len(cursor.last_doc_ids) for cursor in cursors) - blocks_decoded
+
+    return sorted(heap, reverse=True)
+
+
+def _terms_scorer(index_reader: IndexReader):
+    """
+    Creates the function that scores the documents of a query given the
+    weight and postings location of each of its terms and that retrieves
+    the review ids of the best ones. Scores are the sum of the query term
+    weight times the document weight, added in query term order.
+    When numpy is available the postings are decoded into arrays and
+    the scores accumulated with vectorized operations. The postings are
+    read from the index unless a function reading them is given.
+    :param index_reader:
+    :return:
+    """
+    retrieve_review_ids = _review_ids_retriever(index_reader)
+
+    def score_terms(
+            weighted_terms: List[WeightedTerm],
+            results_limit: int,
+            read_postings=index_reader.read_postings
+    ) -> SearchResults:
+        scores: Dict[int, float] = defaultdict(float)
+
+        for term_weight, segment_path, offset, post_len in weighted_terms:
+            postings = read_postings(segment_path, offset, post_len)
+
+            for doc_id, doc_weight in postings:
+                scores[doc_id] += term_weight * doc_weight
+
+        return retrieve_review_ids(top_k(scores, results_limit))
+
+    def score_terms_arrays(
+            weighted_terms: List[WeightedTerm],
+            results_limit: int,
+            read_postings=index_reader.read_postings_arrays
+    ) -> SearchResults:
+        l_postings = [
+            (term_weight, *read_postings(segment_path, offset, post_len))
+            for term_weight, segment_path, offset, post_len in weighted_terms
+        ]
+        doc_ids, scores = _accumulate(l_postings, index_reader.properties.review_count)
+        return retrieve_review_ids(top_k_arrays(doc_ids, scores, results_limit))
+
+    return score_terms if np is None else score_terms_arrays
+
+
+def _shared_postings_reader(index_reader: IndexReader, locations: Iterable[PostingsLocation]):
+    """
+    Reads and decodes the postings of every distinct location once, in
+    segment and offset order, so the postings shared by many queries are
+    decoded once and each segment is read front to back.
+    :param index_reader:
+    :param locations: postings locations of the terms of many queries.
+    :return: function returning the decoded postings of a location, like
+    the reader functions of the index reader.
+    """
+    if np is None:
+        # The postings are read as a generator, which can only be iterated once
+        shared_postings = {
+            location: list(index_reader.read_postings(*location)) for location in sorted(set(locations))
+        }
+    else:
+        shared_postings = {
+            location: index_reader.read_postings_arrays(*location) for location in sorted(set(locations))
+        }
+
+    def read_shared_postings(segment_path: Path, offset: Offset, post_len: PostingLen):
+        return shared_postings[segment_path, offset, post_len]
+
+    return read_shared_postings
+
+
+def _batch_terms_searcher(
+        index_reader: IndexReader,
+        weigh_terms: Callable[[str], List[WeightedTerm]],
+        score_terms
+):
+    """
+    Creates the batch version of a searcher made of 'weigh_terms' and of
+    'score_terms' of _terms_scorer. Every query is weighed before reading
+    the postings of all of them at once.
+    :param index_reader:
+    :param weigh_terms: function returning the weighted terms of a query.
+    :param score_terms:
+    :return:
+    """
+    def search_batch(queries: List[str], results_limit=100) -> List[SearchResults]:
+        l_weighted_terms = [weigh_terms(query) for query in queries]
+        read_postings = _shared_postings_reader(index_reader, (
+            (segment_path, offset, post_len)
+            for weighted_terms in l_weighted_terms
+            for _, segment_path, offset, post_len in weighted_terms
+        ))
+        return [score_terms(weighted_terms, results_limit, read_postings) for weighted_terms in l_weighted_terms]
+
+    return search_batch
+
+
+def _accumulate(l_postings, review_count: int):
+    """
+    Accumulates the scores with the accumulator that suits the number of postings.
+    :param l_postings: list of (term weight, doc ids array, weights array)
+    :param review_count:
+    :return: ascending doc ids of the matched documents and their scores.
+    """
+    posting_count = sum(len(doc_ids) for _, doc_ids, _ in l_postings)
+
+    if posting_count * SPARSE_ACCUMULATOR_RATIO < review_count:
+        return _sparse_accumulate(l_postings)
+
+    return _dense_accumulate(l_postings, review_count)
+
+
+def _dense_accumulate(l_postings, review_count: int):
+    """
+    Accumulates the scores in an array with room for every review.
+    :param l_postings: list of (term weight, doc ids array, weights array)
+    :param review_count:
+    :return: ascending doc ids of the matched documents and their scores.
+    """
+    accumulator = np.zeros(review_count, dtype=np.float64)
+    matched = np.zeros(review_count, dtype=bool)
+
+    for term_weight, doc_ids, weights in l_postings:
+        accumulator[doc_ids] += term_weight * weights
+        matched[doc_ids] = True
+
+    doc_ids = np.flatnonzero(matched)
+    return doc_ids, accumulator[doc_ids]
+
+
+def _sparse_accumulate(l_postings):
+    """
+    Accumulates the scores only for the documents matched by the query.
+    :param l_postings: list of (term weight, doc ids array, weights array)
+    :return: ascending doc ids of the matched documents and their scores.
+    """
+    if len(l_postings) == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+
+    doc_ids, accumulator_idxs = np.unique(
+        np.concatenate([term_doc_ids for _, term_doc_ids, _ in l_postings]),
+        return_inverse=True
+    )
+    accumulator = np.zeros(len(doc_ids), dtype=np.float64)
+    start = 0
+
+    for term_weight, term_doc_ids, weights in l_postings:
+        end = start + len(term_doc_ids)
+        accumulator[accumulator_idxs[start:end]] += term_weight * weights
+        start = end
+
+    return doc_ids, accumulator
+
+
+def _review_ids_retriever(index_reader: IndexReader):
+    def _retrieve_review_ids(top_doc_ids: List[Tuple[float, int]]) -> SearchResults:
+        review_ids = index_reader.read_review_ids([doc_id for _, doc_id in top_doc_ids])
+        return [(review_id, score) for review_id, (score, _) in zip(review_ids, top_doc_ids)]
+
+    return _retrieve_review_ids
+
+
+def top_k(scores: Dict[int, float], results_limit: int) -> List[Tuple[float, int]]:
+    """
+    Selects the 'results_limit' best (score, doc_id) pairs ordered from best to
+    worst, ties being broken by the largest doc_id. A bounded heap is used so
+    this takes O(n log k) instead of sorting every scored document.
+    When 'results_limit' is smaller than 1 every document is returned.
+    :param scores:
+    :param results_limit:
+    :return:
+    """
+    score_doc_ids = ((score, doc_id) for doc_id, score in scores.items())
+
+    if results_limit < 1:
+        return sorted(score_doc_ids, reverse=True)
+
+    return heapq.nlargest(results_limit, score_doc_ids)
 
-        with open(review_ids_path, "rb") as review_ids_file:
-            search_results = [(read_review_id(review_ids_file, doc_id), score) for score, doc_id in sorted_doc_ids]
 
-        return search_results
+def top_k_arrays(doc_ids, scores, results_limit: int) -> List[Tuple[float, int]]:
+    """
+    Array version of top_k using argpartition. It selects and orders the
+    documents exactly like top_k does.
+    :param doc_ids: numpy array of ascending doc ids.
+    :param scores: numpy array with the score of each doc id.
+    :param results_limit:
+    :return:
+    """
+    if 0 < results_limit < len(scores):
+        kth_score = scores[np.argpartition(scores, len(scores) - results_limit)[len(scores) - results_limit]]
+        above = np.flatnonzero(scores > kth_score)
+        ties = np.flatnonzero(scores == kth_score)
+        # Ties go to the largest doc ids, which are the last ones.
+        selected = np.concatenate((above, ties[len(ties) - (results_limit - len(above)):]))
+        doc_ids = doc_ids[selected]
+        scores = scores[selected]
 
-    return _retrieve_with_scores
+    order = np.lexsort((doc_ids, scores))[::-1]
+    return list(zip(scores[order].tolist(), doc_ids[order].tolist()))
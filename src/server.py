@@ -0,0 +1,143 @@
+"""
+Script that opens an index once and answers search requests from local
+clients until it is stopped, so queries don't pay for opening the index.
+
+Clients connect through TCP or a Unix socket and send one request per line,
+each a JSON object with the query and optionally the number of results,
+which must be at least 1
+
+    {"query": "great graphics", "k": 10}
+
+and receive one JSON object per line for each request, in order, with the
+results and the time the search took in seconds
+
+    {"results": [["R1X2Y3Z4", 12.5], ...], "latency": 0.0031}
+
+or with an error message when the request couldn't be answered.
+Every connection is served concurrently, but searches are CPU bound and
+share the reader and its vocabulary cache, so they run one at a time in
+the event loop and the connections take turns between requests.
+
+Usage: python src/server.py [-out index_path] [-host host] [-port port] [-unix socket_path]
+"""
+import asyncio
+import json
+import signal
+import time
+from argparse import ArgumentParser
+from typing import Callable
+
+import processor
+import searching
+from arguments import default_arguments, memory_size
+from definitions import PruningStatistics, SearchMode
+from store import index
+from store.reader import IndexReader
+
+
+def _request_handler(search_func: Callable, default_results_limit: int):
+    def handle_request(request_line: bytes) -> dict:
+        try:
+            request = json.loads(request_line)
+            query = str(request["query"]).strip().lower()
+            results_limit = int(request.get("k", default_results_limit))
+        except (ValueError, TypeError, KeyError, AttributeError) as error:
+            return {"error": f"Invalid request: {error!r}"}
+
+        # Searchers return every matched document below 1, which would hold up every other connection
+        if results_limit < 1:
+            return {"error": f"Invalid request: k must be at least 1, got {results_limit}"}
+
+        start_time = time.perf_counter()
+
+        # A query that fails is answered with its error so the connection keeps being served
+        try:
+            results = search_func(query, results_limit)
+        except Exception as error:
+            print(f"[server]: '{query}' failed: {error!r}")
+            return {"error": f"Search failed: {error!r}"}
+
+        latency = time.perf_counter() - start_time
+
+        print(f"[server]: '{query}' {len(results)} results in {latency * 1000:.2f} ms")
+        return {"results": results, "latency": latency}
+
+    return handle_request
+
+
+def _connection_handler(handle_request: Callable[[bytes], dict]):
+    async def handle_connection(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request_line = await reader.readline()
+
+                if len(request_line) == 0:
+                    break
+
+                if len(request_line.strip()) == 0:
+                    continue
+
+                writer.write(json.dumps(handle_request(request_line)).encode("utf-8") + b"\n")
+                # Lets the other connections take their turn between requests
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    return handle_connection
+
+
+async def serve(index_reader: IndexReader, arg_values):
+    search_func = searching.get_searcher(
+        index_reader, arg_values.search_mode, PruningStatistics(), arg_values.k1, arg_values.b
+    )
+    handle_connection = _connection_handler(_request_handler(search_func, arg_values.query_limit))
+
+    if arg_values.unix_path is not None:
+        server = await asyncio.start_unix_server(handle_connection, arg_values.unix_path)
+        print(f"[server]: Listening on '{arg_values.unix_path}'")
+    else:
+        server = await asyncio.start_server(handle_connection, arg_values.host, arg_values.port)
+        print(f"[server]: Listening on {arg_values.host}:{arg_values.port}")
+
+    stopped = asyncio.Event()
+
+    for signal_number in (signal.SIGINT, signal.SIGTERM):
+        try:
+            asyncio.get_running_loop().add_signal_handler(signal_number, stopped.set)
+        except NotImplementedError:  # Without signal handlers Ctrl+C stops the server instead
+            pass
+
+    async with server:
+        await stopped.wait()
+
+    print("[server]: Stopped.")
+
+
+arg_parser = ArgumentParser(description="Serve search requests from an index kept open.")
+arg_parser.add_argument("-out", "--index-path", dest="index_path", default=default_arguments["index_path"])
+arg_parser.add_argument("-host", "--host", dest="host", default="127.0.0.1")
+arg_parser.add_argument("-port", "--port", dest="port", type=int, default=8642)
+arg_parser.add_argument("-unix", "--unix-socket", dest="unix_path", default=None)
+arg_parser.add_argument("-ql", "--query-limit", dest="query_limit", type=int, default=default_arguments["query_limit"])
+arg_parser.add_argument("-sm", "--search-mode", dest="search_mode", type=SearchMode,
+                        default=default_arguments["search_mode"])
+arg_parser.add_argument("-k1", dest="k1", type=float, default=default_arguments["k1"])
+arg_parser.add_argument("-b", dest="b", type=float, default=default_arguments["b"])
+arg_parser.add_argument("-vcm", "--vocabulary-cache-memory", dest="vocabulary_cache_memory", type=memory_size,
+                        default=default_arguments["vocabulary_cache_memory"])
+
+
+if __name__ == "__main__":
+    arg_values = arg_parser.parse_args()
+    index_directory = index.IndexDirectory(arg_values.index_path)
+
+    with IndexReader(index_directory, arg_values.vocabulary_cache_memory) as index_reader:
+        try:
+            asyncio.run(serve(index_reader, arg_values))
+        except KeyboardInterrupt:
+            print("[server]: Stopped.")
+
+        print(f"[server]: Vocabulary cache {index_reader.vocabulary_cache.statistics()}")
+        print(f"[server]: Stemming cache {processor.stemming_cache.statistics()}")
@@ -1,69 +1,363 @@
-from typing import List, Generator, TextIO, Optional
-from definitions import Vocabulary, TermPostingsEntry, Block
-from store.postings import serialize_postings, deserialize_postings
+"""
+Module containing the writer and the merge iterator of the temporary blocks.
+
+Blocks are binary files with the records of the terms in term order. Each record is
+
+    term length, term posting count, posting count, doc entries count, term, doc entries, weights
+
+with the lengths and counts as fixed width integers, the doc entries as
+32 bit integers holding the doc id, the positions count and the positions
+of each posting, and the weights as 64 bit floats. The doc entries and the
+weights are the arrays of the PostingsDictionary written as they are, so
+writing and reading a block never formats or parses a number as text.
+The postings of a term may be split into consecutive records, each with
+part of its postings, and the term posting count of all of them is the
+posting count of the term in the block, so the merge knows how many
+postings a term has before reading them.
+Records are grouped into frames of about BLOCK_FRAME_SIZE bytes which are
+compressed with zlib and written after their compressed and raw lengths.
+The frames end with an empty frame header followed by the frame index,
+which holds the first term, the offset and the raw length of each frame
+and is also compressed, and by the offset of the frame index. The frame
+index lets a reader start at the frame holding a given term and gives a
+sample of the vocabulary of the block.
+Blocks are only read by the processes that wrote them, so numbers are in
+the native byte order.
+
+When there are more blocks than the merge fan-in, groups of blocks are
+merged into larger blocks of the same format until the remaining blocks
+can be merged into the index at once. Merged blocks keep a record per
+record of the merged blocks, so no record is larger than the records of
+the blocks written while indexing.
+"""
+import os
+import struct
+import zlib
+from array import array
+from typing import List, Generator, BinaryIO, Iterable, Optional, Tuple
+from definitions import Block, MergedPostingsEntry, Postings, Term
+from dictionary import PostingsDictionary
 
 import heapq
 
 
-def write_block(block_path: str, vocabulary: Vocabulary):
+BLOCK_FRAME_SIZE = 256 * 1024
+
+# Read buffer of each open block, so that a merge reading many blocks
+# at once reads each of them in a few large requests
+BLOCK_READ_BUFFER_SIZE = 1024 * 1024
+
+# compressed length, raw length
+_frame_header = struct.Struct("=II")
+# term length, term posting count, posting count, doc entries count
+_record_header = struct.Struct("=HIII")
+# frame offset, raw length, term length
+_frame_entry = struct.Struct("=QIH")
+# frame index offset
+_block_trailer = struct.Struct("=Q")
+_doc_entry_size = array("I").itemsize
+_weight_size = array("d").itemsize
+
+
+def _write_frame(block_file: BinaryIO, frame: bytearray, first_term: bytes, frame_index: bytearray):
+    frame_index += _frame_entry.pack(block_file.tell(), len(frame), len(first_term))
+    frame_index += first_term
+    compressed_frame = zlib.compress(frame, 1)
+    block_file.write(_frame_header.pack(len(compressed_frame), len(frame)))
+    block_file.write(compressed_frame)
+
 
-    with open(block_path, "w", newline="\n") as block_file:
+def _write_frame_index(block_file: BinaryIO, frame_index: bytearray):
+    block_file.write(_frame_header.pack(0, 0))
+    frame_index_offset = block_file.tell()
+    block_file.write(zlib.compress(frame_index, 1))
+    block_file.write(_block_trailer.pack(frame_index_offset))
+
+
+def _write_records(block_path: str, records: Iterable[Tuple[Term, int, array, array]]):
+
+    with open(block_path, "wb") as block_file:
         print(f"[BlockWriter]: Writing {block_path}")
+        frame = bytearray()
+        frame_index = bytearray()
+        first_term = b""
+
+        for term, term_posting_count, doc_entries, weights in records:
+            term_bytes = term.encode("utf-8")
+
+            if len(frame) == 0:
+                first_term = term_bytes
 
-        sorted_terms = sorted(vocabulary.keys())
+            frame += _record_header.pack(len(term_bytes), term_posting_count, len(weights), len(doc_entries))
+            frame += term_bytes
+            frame += doc_entries.tobytes()
+            frame += weights.tobytes()
 
-        for term in sorted_terms:
-            block_file.write(f"{term};{serialize_postings(vocabulary[term])}\n")
+            if len(frame) >= BLOCK_FRAME_SIZE:
+                _write_frame(block_file, frame, first_term, frame_index)
+                frame = bytearray()
+
+        if len(frame) > 0:
+            _write_frame(block_file, frame, first_term, frame_index)
+
+        _write_frame_index(block_file, frame_index)
 
         print(f"[BlockWriter]: Finished writing {block_path}")
 
 
-def _block(block_path: Optional[str] = None, *, f: Optional[TextIO] = None) -> Optional[Block]:
-    block_file: TextIO = f if block_path is None else open(block_path)
-    block_line = block_file.readline()
+def write_block(block_path: str, postings_dictionary: PostingsDictionary):
+    _write_records(
+        block_path,
+        (
+            (term, len(weights), doc_entries, weights)
+            for term, doc_entries, weights in postings_dictionary.sorted_postings()
+        )
+    )
+
+
+def _pack_postings(
+        entries: Iterable[MergedPostingsEntry]
+) -> Generator[Tuple[Term, int, array, array], None, None]:
+    for term, posting_count, l_postings in entries:
+        for postings in l_postings:
+            doc_entries = array("I")
+            weights = array("d")
+
+            for doc_id, weight, positions in postings:
+                doc_entries.append(doc_id)
+                doc_entries.append(len(positions))
+                doc_entries.extend(positions)
+                weights.append(weight)
+
+            yield term, posting_count, doc_entries, weights
+
+
+def merge_into_block(block_path: str, block_paths: List[str]) -> Tuple[int, int]:
+    """
+    Merges a group of blocks into a single block.
+    :param block_path: path of the merged block.
+    :param block_paths: blocks to be merged.
+    :return: bytes read and bytes written.
+    """
+    _write_records(block_path, _pack_postings(blocks_iterator(block_paths)))
+    return sum(map(os.path.getsize, block_paths)), os.path.getsize(block_path)
+
+
+def merge_groups(block_count: int, fan_in: int) -> List[int]:
+    """
+    Splits the blocks of a merge pass into the fewest groups of at most
+    'fan_in' blocks, with sizes differing by one at most so that the
+    merged blocks stay about the same size.
+    :param block_count:
+    :param fan_in:
+    :return: size of each group.
+    """
+    group_count = -(-block_count // fan_in)
+    group_size, larger_groups = divmod(block_count, group_count)
+    return [group_size + 1] * larger_groups + [group_size] * (group_count - larger_groups)
+
+
+def read_frame_index(block_path: str) -> List[Tuple[Term, int, int]]:
+    """
+    :param block_path:
+    :return: first term, offset and raw length of each frame of a block.
+    """
+    with open(block_path, "rb") as block_file:
+        block_file.seek(-_block_trailer.size, os.SEEK_END)
+        trailer_offset = block_file.tell()
+        frame_index_offset, = _block_trailer.unpack(block_file.read(_block_trailer.size))
+        block_file.seek(frame_index_offset)
+        frame_index = zlib.decompress(block_file.read(trailer_offset - frame_index_offset))
+
+    entries = []
+    position = 0
+
+    while position < len(frame_index):
+        frame_offset, frame_len, term_len = _frame_entry.unpack_from(frame_index, position)
+        position += _frame_entry.size + term_len
+        entries.append((str(frame_index[position - term_len:position], "utf-8"), frame_offset, frame_len))
+
+    return entries
+
+
+def term_range_splits(block_paths: List[str], range_count: int) -> List[Term]:
+    """
+    Chooses the terms splitting the vocabulary of the blocks into ranges
+    of about the same size. The first terms of the frames of every block
+    are a sample of the vocabulary, each of them standing for the raw
+    bytes of its frame.
+    :param block_paths:
+    :param range_count:
+    :return: up to 'range_count' - 1 terms in order, each starting a range.
+    """
+    samples = sorted(
+        (first_term, frame_len)
+        for block_path in block_paths
+        for first_term, _, frame_len in read_frame_index(block_path)
+    )
+    total_size = sum(frame_len for _, frame_len in samples)
+    splits = []
+    accum_size = 0
+
+    for first_term, frame_len in samples:
+        # Size of the vocabulary before the start of the next range
+        next_share = total_size * (len(splits) + 1) / range_count
+
+        if accum_size >= next_share and (len(splits) == 0 or splits[-1] != first_term):
+            splits.append(first_term)
+
+            if len(splits) == range_count - 1:
+                break
+
+        accum_size += frame_len
+
+    return splits
+
+
+class BlockReader:
+    def __init__(self, block_path: str, start_term: Optional[Term] = None, end_term: Optional[Term] = None):
+        """
+        Reads the records of a block one at a time, decompressing a frame
+        whenever the previous one has been read.
+        :param block_path:
+        :param start_term: When given, the records of the terms before it
+        are skipped and reading starts at the last frame starting before it.
+        :param end_term: When given, the block ends before the records of
+        this term and of the terms after it.
+        """
+        self._block_file: BinaryIO = open(block_path, "rb", buffering=BLOCK_READ_BUFFER_SIZE)
+        self._frame = b""
+        self._frame_view = memoryview(self._frame)
+        self._position = 0
+        self._start_term = start_term
+        self._end_term = end_term
+        self._ended = False
+
+        if start_term is not None:
+            start_frames = [offset for first_term, offset, _ in read_frame_index(block_path) if first_term < start_term]
+
+            if len(start_frames) != 0:
+                self._block_file.seek(start_frames[-1])
+
+    def _read_frame(self) -> bool:
+        header = self._block_file.read(_frame_header.size)
+        compressed_len, _ = _frame_header.unpack(header)
+
+        if compressed_len == 0:
+            return False
+
+        self._frame = zlib.decompress(self._block_file.read(compressed_len))
+        self._frame_view = memoryview(self._frame)
+        self._position = 0
+        return True
+
+    def read_record(self) -> Optional[Tuple[Term, int, Postings]]:
+        """
+        :return: the term, the term posting count and the postings of the next
+        record or None once the block has been read.
+        """
+        while not self._ended:
+            if self._position == len(self._frame) and not self._read_frame():
+                self._ended = True
+                break
+
+            frame, position = self._frame, self._position
+            term_len, term_posting_count, posting_count, entries_count = _record_header.unpack_from(frame, position)
+            entries_start = position + _record_header.size + term_len
+            weights_start = entries_start + _doc_entry_size * entries_count
+            self._position = weights_start + _weight_size * posting_count
+            term = str(frame[entries_start - term_len:entries_start], "utf-8")
+
+            if self._start_term is not None and term < self._start_term:
+                continue
+
+            if self._end_term is not None and term >= self._end_term:
+                self._ended = True
+                break
+
+            return term, term_posting_count, _unpack_postings(
+                self._frame_view[entries_start:weights_start].cast("I"),
+                self._frame_view[weights_start:self._position].cast("d")
+            )
 
-    if len(block_line) == 0:
-        block_file.close()
         return None
 
-    term, posting_data = block_line.split(";", 1)
-    postings = deserialize_postings(posting_data)
-    return term, postings[0][0], postings, block_file
+    def close(self):
+        self._block_file.close()
 
 
-def _next_postings(blocks: List[Block]) -> TermPostingsEntry:
-    top_block = heapq.heappop(blocks)
-    term, _, postings, block_file = top_block
+def _unpack_postings(doc_entries: memoryview, weights: memoryview) -> Postings:
+    postings = []
+    position = 0
 
-    new_block = _block(f=block_file)
+    for weight in weights:
+        pos_count = doc_entries[position + 1]
+        postings.append((doc_entries[position], weight, doc_entries[position + 2:position + 2 + pos_count].tolist()))
+        position += 2 + pos_count
 
-    if new_block is not None:
-        heapq.heappush(blocks, new_block)
+    return postings
+
+
+def _block(block_reader: BlockReader) -> Optional[Block]:
+    record = block_reader.read_record()
+
+    if record is None:
+        block_reader.close()
+        return None
 
-    return term, postings
+    term, term_posting_count, postings = record
+    return term, postings[0][0], term_posting_count, postings, block_reader
 
 
-def blocks_iterator(block_paths: List[str]) -> Generator[TermPostingsEntry, None, None]:
+def _term_postings(term: Term, term_blocks: List[Block], blocks: List[Block]) -> Generator[Postings, None, None]:
+    """
+    Reads the records of 'term' of each of 'term_blocks', which are in
+    doc id order, pushing the blocks back to 'blocks' once they move past it.
+    """
+    for _, _, _, postings, block_reader in term_blocks:
+        yield postings
+        block = _block(block_reader)
+
+        while block is not None and block[0] == term:
+            yield block[3]
+            block = _block(block_reader)
+
+        if block is not None:
+            heapq.heappush(blocks, block)
+
+
+def blocks_iterator(
+        block_paths: List[str],
+        start_term: Optional[Term] = None,
+        end_term: Optional[Term] = None
+) -> Generator[MergedPostingsEntry, None, None]:
     """
     Iterates through a list of block files. This iterator takes care of
-    reading the postings by term and docId order and of aggregating postings
-    of the same terms into a single postings, yielding that as the result of
-    each iteration.
+    reading the postings by term and docId order. Each iteration yields a
+    term, its posting count and an iterator of its postings in parts, one
+    per record of the blocks, which reads them only as they are iterated,
+    so the postings of a term are never held all at once. The parts must
+    be read before the next iteration, the ones that aren't are skipped.
     :param block_paths:
+    :param start_term: First term of the range of terms to iterate, when given.
+    :param end_term: Term after the range of terms to iterate, when given.
     :return:
     """
-    blocks = [_block(block_path) for block_path in block_paths]
+    block_readers = (BlockReader(block_path, start_term, end_term) for block_path in block_paths)
+    # Empty blocks have no terms to merge
+    blocks = [block for block in map(_block, block_readers) if block is not None]
     heapq.heapify(blocks)
 
-    accum_postings = _next_postings(blocks)
-
     while len(blocks) != 0:
-        term, postings = _next_postings(blocks)
+        term = blocks[0][0]
+        term_blocks = []
+
+        # Every block holds a range of doc ids, so they are popped in doc id order
+        while len(blocks) != 0 and blocks[0][0] == term:
+            term_blocks.append(heapq.heappop(blocks))
 
-        if accum_postings[0] != term:
-            yield accum_postings
-            accum_postings = (term, postings)
-        else:
-            accum_postings[1].extend(postings)
+        l_postings = _term_postings(term, term_blocks, blocks)
+        yield term, sum(block[2] for block in term_blocks), l_postings
 
-    yield accum_postings
+        for _ in l_postings:
+            pass
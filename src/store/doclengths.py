@@ -0,0 +1,41 @@
+"""
+Module handling the document lengths file of the indexes that compute
+the BM25 weights while searching. The file holds the length of every
+document in doc id order as little endian 32 bit integers, so it can be
+memory mapped and indexed by doc id without being parsed.
+"""
+import sys
+from array import array
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional, only the array view needs it
+    np = None
+
+
+def write_document_lengths(document_lengths_path: str, document_lengths: array):
+    document_lengths = array("I", document_lengths)
+
+    if sys.byteorder != "little":
+        document_lengths.byteswap()
+
+    with open(document_lengths_path, "wb") as document_lengths_file:
+        document_lengths.tofile(document_lengths_file)
+
+
+def document_lengths_view(document_lengths_data):
+    """
+    :param document_lengths_data: bytes like object with the document lengths
+    file. Usually the file memory mapped.
+    :return: a sequence of the document lengths indexed by doc id, which is
+    a numpy array when numpy is available.
+    """
+    if np is not None:
+        return np.frombuffer(document_lengths_data, dtype="<u4")
+
+    if sys.byteorder != "little":
+        document_lengths = array("I", bytes(document_lengths_data))
+        document_lengths.byteswap()
+        return document_lengths
+
+    return memoryview(document_lengths_data).cast("I")
@@ -1,7 +1,7 @@
 import json
 import processor
 from typing import Set
-from definitions import IndexingFormat, IndexPropsDict, IndexProperties
+from definitions import IndexingFormat, IndexPropsDict, IndexProperties, PositionsStorage, PostingsCodec
 
 
 def write_props(
@@ -12,7 +12,10 @@ def write_props(
         review_count: int,
         min_token_length: int,
         stopwords: Set[str],
-        used_stemmer: bool
+        used_stemmer: bool,
+        postings_codec: PostingsCodec,
+        positions_storage: PositionsStorage,
+        avg_document_length: float
 ):
     with open(props_path, "w", encoding="utf-8") as props_file:
         props_dict: IndexPropsDict = {
@@ -21,8 +24,11 @@ def write_props(
             "term_count": term_count,
             "review_count": review_count,
             "min_token_length": min_token_length,
-            "stopwords": list(stopwords),
-            "stemmer": "english_stemmer" if used_stemmer else "no_stemmer"
+            "stopwords": sorted(stopwords),
+            "stemmer": "english_stemmer" if used_stemmer else "no_stemmer",
+            "postings_codec": postings_codec.value,
+            "positions_storage": positions_storage.value,
+            "avg_document_length": avg_document_length
         }
         json.dump(props_dict, props_file)
 
@@ -40,5 +46,8 @@ def read_props(
             props_dict['review_count'],
             props_dict['min_token_length'],
             set(props_dict['stopwords']),
-            processor.english_stemmer if props_dict['stemmer'] == "english_stemmer" else processor.no_stemmer
+            processor.english_stemmer if props_dict['stemmer'] == "english_stemmer" else processor.no_stemmer,
+            PostingsCodec(props_dict.get('postings_codec', PostingsCodec.TEXT.value)),
+            PositionsStorage(props_dict.get('positions_storage', PositionsStorage.INLINE.value)),
+            props_dict.get('avg_document_length')
         )
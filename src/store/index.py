@@ -1,4 +1,4 @@
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 from definitions import Term
 
 from enum import Enum, auto
@@ -22,21 +22,27 @@ class IndexDirectory:
             self,
             index_path: str,
             block_prefix: str = "block",
-            vocabulary_file_name: str = "vocabulary.txt",
-            postings_file_name: str = "postings.txt"
+            vocabulary_file_name: str = "vocabulary.bin",
+            postings_file_name: str = "postings.txt",
+            positions_file_name: Optional[str] = None
     ):
         self.index_path = index_path
         self.block_prefix = block_prefix
         self.vocabulary_file_name = vocabulary_file_name
         self.postings_file_name = postings_file_name
+        self.positions_file_name = positions_file_name
 
         self.review_ids_path = f"{index_path}/review_ids.txt"
+        self.review_offsets_path = f"{index_path}/review_offsets.bin"
+        self.review_id_order_path = f"{index_path}/review_id_order.bin"
+        self.document_lengths_path = f"{index_path}/document_lengths.bin"
         self.idx_props_path = f"{index_path}/properties.json"
         self.blocks_dir_path = f"{index_path}/blocks"
         self.segments_dir_path = f"{index_path}/segments"
 
         self.block_paths: List[str] = []
-        self.segment_paths: List[Tuple[str, str, str]] = []
+        self.blocks_created = 0
+        self.segment_paths: List[Tuple[str, str, str, Optional[str]]] = []
 
     @property
     def block_count(self):
@@ -56,6 +62,7 @@ class IndexDirectory:
 
         os.mkdir(self.index_path)
         _create_file(self.review_ids_path)
+        _create_file(self.review_offsets_path)
         _create_file(self.idx_props_path)
         os.mkdir(self.blocks_dir_path)
         os.mkdir(self.segments_dir_path)
@@ -65,38 +72,99 @@ class IndexDirectory:
         Creates a new block path and adds it to the internal block paths list.
         :return:
         """
-        block_path = f"{self.blocks_dir_path}/{self.block_prefix}_{self.block_count}.txt"
+        block_path = f"{self.blocks_dir_path}/{self.block_prefix}_{self.blocks_created}.bin"
         self.block_paths.append(block_path)
+        self.blocks_created += 1
         return block_path
 
-    def make_segment_dir(self, first_term: Term, last_term: Term):
+    def replace_blocks(self, block_paths: List[str], delete: bool):
         """
-        Creates a new a triple of segment paths as
-        (segment_path, vocabulary_path, postings_path)
+        Replaces the block paths list with the blocks of a merge pass.
+        :param block_paths: blocks left after the merge pass.
+        :param delete: whether the merged blocks are deleted.
         :return:
         """
-        segment_dir = f"{self.segments_dir_path}/{first_term}-{last_term}"
+        if delete:
+            for block_path in set(self.block_paths).difference(block_paths):
+                os.remove(block_path)
+
+        self.block_paths = block_paths
+
+    def make_segment_dir(self, first_term: Term):
+        """
+        Creates the directory of a new segment, which is named after its
+        range of terms once 'close_segment_dir' is called.
+        :return: a tuple of segment paths as
+        (segment_path, vocabulary_path, postings_path, positions_path)
+        positions_path is None when the index has no positions.
+        """
+        segment_dir = f"{self.segments_dir_path}/{first_term}-"
 
         os.mkdir(segment_dir)
 
-        vocabulary_path = f"{segment_dir}/{self.vocabulary_file_name}"
-        postings_path = f"{segment_dir}/{self.postings_file_name}"
-        result_paths = (segment_dir, vocabulary_path, postings_path)
+        return self._segment_paths(segment_dir)
+
+    def close_segment_dir(self, segment_paths: Tuple[str, str, str, Optional[str]], last_term: Term):
+        """
+        Names the directory of a complete segment after its first and last
+        terms and adds it to the internal segment paths list.
+        :return: the tuple of segment paths after renaming the directory.
+        """
+        segment_dir = f"{segment_paths[0]}{last_term}"
+
+        os.rename(segment_paths[0], segment_dir)
+
+        result_paths = self._segment_paths(segment_dir)
         self.segment_paths.append(result_paths)
 
         return result_paths
 
+    def _segment_paths(self, segment_dir: str):
+        vocabulary_path = f"{segment_dir}/{self.vocabulary_file_name}"
+        postings_path = f"{segment_dir}/{self.postings_file_name}"
+        positions_path = f"{segment_dir}/{self.positions_file_name}" if self.positions_file_name else None
+        return segment_dir, vocabulary_path, postings_path, positions_path
+
+    def block_sizes(self) -> List[int]:
+        return [os.path.getsize(block_path) for block_path in self.block_paths]
+
     def delete_blocks_dir(self):
         print(f"[IndexDirectory]: Deleting {self.blocks_dir_path}")
         shutil.rmtree(self.blocks_dir_path)
         self.block_paths = []
 
+    def postings_size(self):
+        total_size = 0
+
+        for _, _, postings_path, _ in self.segment_paths:
+            total_size += os.path.getsize(postings_path)
+
+        return total_size
+
+    def positions_size(self):
+        total_size = 0
+
+        for _, _, _, positions_path in self.segment_paths:
+            if positions_path is not None:
+                total_size += os.path.getsize(positions_path)
+
+        return total_size
+
     def index_size(self):
         """
         Index size on disk without the size of the properties file
         :return:
         """
-        total_size = os.path.getsize(self.review_ids_path)
+        total_size = os.path.getsize(self.review_ids_path) + self.segments_size()
+
+        for file_path in (self.review_offsets_path, self.review_id_order_path, self.document_lengths_path):
+            if os.path.exists(file_path):
+                total_size += os.path.getsize(file_path)
+
+        return total_size
+
+    def segments_size(self):
+        total_size = 0
 
         for segment_path in os.listdir(self.segments_dir_path):
             for file_path in os.listdir(f"{self.segments_dir_path}/{segment_path}"):
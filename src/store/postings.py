@@ -1,6 +1,39 @@
 import math
-from typing import List
-from definitions import Path, Offset, PostingLen, PostingResults, Postings
+import struct
+from array import array
+from bisect import bisect_left
+from typing import BinaryIO, Iterable, List, Callable, Optional, Sequence, Tuple
+from definitions import (
+    DocId, PositionsStorage, Position, PostingResults, Postings, PostingsCodec, TermWeighting, TermWeigher, Weight
+)
+from store.vbyte import encode_vbyte, encode_vbytes, decode_vbyte, decode_vbytes, decode_vbytes_array
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional, only the array decoders need it
+    np = None
+
+
+POSTINGS_FILE_NAMES = {
+    PostingsCodec.TEXT: "postings.txt",
+    PostingsCodec.VBYTE: "postings.bin"
+}
+
+POSITIONS_FILE_NAMES = {
+    PostingsCodec.TEXT: "positions.txt",
+    PostingsCodec.VBYTE: "positions.bin"
+}
+
+POSTINGS_BLOCK_SIZE = 128
+
+# Below this many postings numpy costs more than it saves when weighing a part with BM25
+BM25_VECTORIZE_MIN_POSTINGS = 128
+
+# last doc id, block end offset, maximum weight
+_skip_entry = struct.Struct("<IIf")
+
+if np is not None:
+    _skip_entry_dtype = np.dtype([("last_doc_id", "<u4"), ("end", "<u4"), ("max_weight", "<f4")])
 
 
 def serialize_positions(positions: List[int]):
@@ -15,20 +48,267 @@ def serialize_postings(postings: Postings):
     return ";".join(serialize_posting(doc_id, weight, positions) for doc_id, weight, positions in postings)
 
 
-def serialize_as_postings(doc_ids: List[int], weights: List[float], l_pos: List[List[int]]):
-    return ";".join(
-        serialize_posting(doc_id, weight, positions) for doc_id, weight, positions in zip(doc_ids, weights, l_pos)
-    )
+def encode_positions(l_pos: List[List[int]]) -> bytes:
+    """
+    Encodes the positions of the postings of a term in the binary format.
+    The positions of each document are stored as their count followed by
+    the gaps between them, all as variable byte integers.
+    """
+    positions_data = bytearray()
+
+    for positions in l_pos:
+        encode_vbyte(len(positions), positions_data)
+        encode_vbytes(
+            (positions[0], *(positions[i+1] - positions[i] for i in range(0, len(positions)-1))),
+            positions_data
+        )
+
+    return bytes(positions_data)
+
+
+def encode_postings(doc_ids: List[int], weights: List[float], positions_offset: int) -> bytes:
+    """
+    Encodes the postings of a term in the binary format. Postings are split
+    into blocks of POSTINGS_BLOCK_SIZE and the layout is
+
+        posting count, positions offset, blocks, skip table
+
+    The posting count and the offset of the positions of the term in the
+    positions file of the segment are variable byte integers. Each block
+    holds the little endian float32 weights of its postings followed by
+    their doc id gaps as variable byte integers. The skip table has a fixed
+    width entry per block with its last doc id, where it ends and its
+    maximum weight. It is only written when there is more than one block.
+    Block ends are relative to the start of the postings of the term.
+    """
+    blocks = bytearray()
+    encode_vbyte(len(doc_ids), blocks)
+    encode_vbyte(positions_offset, blocks)
+    skip_table = bytearray()
+    prev_doc_id = 0
+
+    for start in range(0, len(doc_ids), POSTINGS_BLOCK_SIZE):
+        end = min(start + POSTINGS_BLOCK_SIZE, len(doc_ids))
+        block_weights = weights[start:end]
+        prev_doc_id = _encode_block(doc_ids[start:end], block_weights, prev_doc_id, blocks)
+        skip_table += _skip_entry.pack(prev_doc_id, len(blocks), max(block_weights))
+
+    if len(doc_ids) <= POSTINGS_BLOCK_SIZE:
+        skip_table = b""
+
+    return bytes(blocks + skip_table)
+
+
+def _encode_block(doc_ids: Sequence[int], weights: Sequence[float], prev_doc_id: int, blocks: bytearray) -> int:
+    """
+    Appends a block of postings to 'blocks'.
+    :return: the last doc id of the block.
+    """
+    blocks += struct.pack(f"<{len(weights)}f", *weights)
+
+    for doc_id in doc_ids:
+        encode_vbyte(doc_id - prev_doc_id, blocks)
+        prev_doc_id = doc_id
+
+    return prev_doc_id
+
+
+def _read_header(data) -> Tuple[int, int, int]:
+    """
+    :param data: postings of a term in the binary format.
+    :return: posting count, positions offset and where the first block starts.
+    """
+    count, position = decode_vbyte(data, 0)
+    positions_offset, blocks_start = decode_vbyte(data, position)
+    return count, positions_offset, blocks_start
+
+
+def _read_skip_table(data) -> Tuple[int, int, List[Tuple[int, int, float]]]:
+    """
+    Postings with a single block have no skip table stored,
+    so its only entry is built by decoding the block.
+    :param data: postings of a term in the binary format.
+    :return: posting count, where the first block starts and the skip table entries.
+    """
+    count, _, blocks_start = _read_header(data)
+    block_count = _block_count(count)
+
+    if block_count > 1:
+        skip_offset = len(data) - block_count * _skip_entry.size
+        return count, blocks_start, list(_skip_entry.iter_unpack(data[skip_offset:]))
+
+    weights = struct.unpack_from(f"<{count}f", data, blocks_start)
+    doc_gaps, block_end = decode_vbytes(data, blocks_start + 4 * count, count)
+    return count, blocks_start, [(sum(doc_gaps), block_end, max(weights))]
+
+
+def _block_count(count: int) -> int:
+    return (count + POSTINGS_BLOCK_SIZE - 1) // POSTINGS_BLOCK_SIZE
+
+
+def _decode_block(data, skip_table: List[Tuple[int, int, float]], count: int, blocks_start: int, block: int):
+    """
+    Decodes the doc ids and weights of a block of the postings of a term.
+    :return: doc ids list and weights list.
+    """
+    prev_doc_id, start = (0, blocks_start) if block == 0 else skip_table[block - 1][:2]
+    block_len = min(POSTINGS_BLOCK_SIZE, count - block * POSTINGS_BLOCK_SIZE)
+    weights = list(struct.unpack_from(f"<{block_len}f", data, start))
+    doc_ids, _ = decode_vbytes(data, start + 4 * block_len, block_len)
+
+    for i in range(block_len):
+        prev_doc_id += doc_ids[i]
+        doc_ids[i] = prev_doc_id
+
+    return doc_ids, weights
+
 
+def decode_postings(data) -> PostingResults:
+    count, blocks_start, skip_table = _read_skip_table(data)
 
-def serial_as_posts_with_diffs(
-    doc_ids: List[int], weights: List[float], l_pos: List[List[int]]
-):
+    for block in range(len(skip_table)):
+        yield from zip(*_decode_block(data, skip_table, count, blocks_start, block))
+
+
+def decode_positions(postings_data, positions_data) -> List[List[Position]]:
+    """
+    Decodes the positions of the postings of a term from the positions file of its segment.
+    :param postings_data: postings of the term in the binary format.
+    :param positions_data: bytes like object with the positions file of the segment.
+    :return: positions of each posting in doc id order.
     """
-    Serializes the postings with doc ids encoded as differences rather than the full doc id.
+    count, position, _ = _read_header(postings_data)
+    l_pos = []
+
+    for _ in range(count):
+        pos_count, position = decode_vbyte(positions_data, position)
+        pos_gaps, position = decode_vbytes(positions_data, position, pos_count)
+        prev_pos = 0
+
+        for i in range(pos_count):
+            prev_pos += pos_gaps[i]
+            pos_gaps[i] = prev_pos
+
+        l_pos.append(pos_gaps)
+
+    return l_pos
+
+
+class PostingsCursor:
+    def __init__(
+            self,
+            last_doc_ids: List[int],
+            max_weights: List[float],
+            posting_count: int,
+            decode_block: Callable[[int], Tuple[List[int], List[float]]]
+    ):
+        """
+        Moves forward through the postings of a term decoding only the
+        blocks it lands on. Blocks are skipped using the last doc id of
+        each block, and the maximum weight of each block gives a bound on
+        the weight of the documents in it without decoding it.
+        'doc_id' is None once the cursor moves past the last posting.
+        :param last_doc_ids: Last doc id of each block.
+        :param max_weights: Maximum weight of each block.
+        :param posting_count:
+        :param decode_block: Function returning the doc ids and weights of a block.
+        """
+        self.last_doc_ids = last_doc_ids
+        self.max_weights = max_weights
+        self.posting_count = posting_count
+        self.blocks_decoded = 0
+        self._decode_block = decode_block
+        self.block = -1
+        self.doc_id: Optional[int] = None
+        self._doc_ids: List[int] = []
+        self._weights: List[float] = []
+        self._position = 0
+        self._load_block(0)
+
+    @property
+    def weight(self) -> float:
+        return self._weights[self._position]
+
+    def _load_block(self, block: int):
+        self.block = block
+
+        if block >= len(self.last_doc_ids):
+            self.doc_id = None
+            return
+
+        self._doc_ids, self._weights = self._decode_block(block)
+        self.blocks_decoded += 1
+        self._position = 0
+        self.doc_id = self._doc_ids[0]
+
+    def next(self):
+        self._position += 1
+
+        if self._position < len(self._doc_ids):
+            self.doc_id = self._doc_ids[self._position]
+        else:
+            self._load_block(self.block + 1)
+
+    def advance(self, target: int):
+        """
+        Moves to the first posting whose doc id is equal or larger than 'target'.
+        The cursor never moves backwards.
+        :param target:
+        :return:
+        """
+        if self.doc_id is None or self.doc_id >= target:
+            return
+
+        if target > self.last_doc_ids[self.block]:
+            self._load_block(bisect_left(self.last_doc_ids, target, self.block + 1))
+
+            if self.doc_id is None:
+                return
+
+        self._position = bisect_left(self._doc_ids, target, self._position)
+        self.doc_id = self._doc_ids[self._position]
+
+    def block_max_weight(self, target: int) -> float:
+        """
+        Upper bound of the weight of 'target' in this postings list,
+        which is the maximum weight of the block it would be in.
+        :param target: Must not be smaller than the current doc id.
+        :return:
+        """
+        if self.doc_id is None:
+            return 0.0
+
+        block = self.block
+
+        if target > self.last_doc_ids[block]:
+            block = bisect_left(self.last_doc_ids, target, block + 1)
+
+        return self.max_weights[block] if block < len(self.max_weights) else 0.0
+
+
+def postings_cursor(postings_data, codec: PostingsCodec = PostingsCodec.TEXT) -> PostingsCursor:
+    if codec is PostingsCodec.VBYTE:
+        count, blocks_start, skip_table = _read_skip_table(postings_data)
+        return PostingsCursor(
+            [last_doc_id for last_doc_id, _, _ in skip_table],
+            [max_weight for _, _, max_weight in skip_table],
+            count,
+            lambda block: _decode_block(postings_data, skip_table, count, blocks_start, block)
+        )
+
+    # Text postings have no skip table so they are a single block.
+    doc_ids, weights = (list(values) for values in zip(*read_postings(postings_data, codec)))
+    return PostingsCursor([doc_ids[-1]], [max(weights)], len(doc_ids), lambda _: (doc_ids, weights))
+
+
+def stored_weight(weight: float, codec: PostingsCodec) -> float:
     """
-    doc_diffs = [doc_ids[0]] + [doc_ids[i+1] - doc_ids[i] for i in range(0, len(doc_ids)-1)]
-    return serialize_as_postings(doc_diffs, weights, l_pos)
+    Rounds a weight to the precision it is stored with by the codec.
+    """
+    if codec is PostingsCodec.VBYTE:
+        return struct.unpack("<f", struct.pack("<f", weight))[0]
+
+    return weight
 
 
 def deserialize_positions(data: str):
@@ -44,79 +324,277 @@ def deserialize_postings(data: str) -> Postings:
     return [deserialize_posting(posting) for posting in data.split(";")]
 
 
-def write_tf_idf_postings(
-        postings_path: str,
-        l_postings: List[Postings],
-        *,
-        review_count: int
-):
-    cur_offset = 0
-    results = []
+class PostingsWriter:
+    def __init__(
+            self,
+            postings_path: str,
+            positions_path: Optional[str],
+            term_weighting: TermWeighting,
+            codec: PostingsCodec
+    ):
+        """
+        Writes the postings of the terms of a segment one term at a time.
+        The postings of a term are written as they are read from the
+        temporary blocks, a part at a time, so the memory used doesn't
+        depend on the length of the postings of a term. Only the skip table
+        of a term, an entry per POSTINGS_BLOCK_SIZE postings, is kept until
+        its postings have been written.
+        :param postings_path:
+        :param positions_path: None when the index has no positions.
+        :param term_weighting: Gives the idf and the weights of a term out of its posting count.
+        :param codec:
+        """
+        self._postings_file: BinaryIO = open(postings_path, "wb", buffering=1024 * 1024)
+        self._positions_file: Optional[BinaryIO] = None
+
+        if positions_path is not None:
+            self._positions_file = open(positions_path, "wb", buffering=1024 * 1024)
+
+        self._term_weighting = term_weighting
+        self._codec = codec
+        self._offset = 0
+        self._positions_offset = 0
+
+    def write(self, posting_count: int, l_postings: Iterable[Postings]) -> Tuple[float, int, int, int, float]:
+        """
+        :param posting_count: Posting count of the term, known before its postings are read.
+        :param l_postings: Postings of the term in parts, in doc id order.
+        :return: idf, offset, length, posting count and maximum weight of the term.
+        """
+        idf, weigh = self._term_weighting(posting_count)
+
+        if self._codec is PostingsCodec.VBYTE:
+            byte_len, max_weight = self._write_vbyte_term(posting_count, l_postings, weigh)
+        else:
+            byte_len, max_weight = self._write_text_term(_weighted_parts(l_postings, weigh))
+
+        entry = (idf, self._offset, byte_len, posting_count, stored_weight(max_weight, self._codec))
+        self._offset += byte_len
+        return entry
+
+    def _write_positions(self, positions_data: bytes):
+        if self._positions_file is not None:
+            self._positions_offset += self._positions_file.write(positions_data)
+
+    def _write_vbyte_term(
+            self, posting_count: int, l_postings: Iterable[Postings], weigh: TermWeigher
+    ) -> Tuple[int, float]:
+        """
+        The postings are weighed a block at a time, so parts smaller than
+        a block are weighed together.
+        """
+        header = bytearray()
+        encode_vbyte(posting_count, header)
+        encode_vbyte(self._positions_offset, header)
+        byte_len = self._postings_file.write(header)
+        skip_table = bytearray()
+        prev_doc_id = 0
+        max_weight = 0.0
+        doc_ids, values = [], []
+
+        def write_block(end: int):
+            nonlocal byte_len, prev_doc_id, max_weight
+            block = bytearray()
+            weights = weigh(doc_ids[:end], values[:end])
+            block_max_weight = max(weights)
+            prev_doc_id = _encode_block(doc_ids[:end], weights, prev_doc_id, block)
+            byte_len += self._postings_file.write(block)
+            skip_table.extend(_skip_entry.pack(prev_doc_id, byte_len, block_max_weight))
+            max_weight = max(max_weight, block_max_weight)
+            del doc_ids[:end]
+            del values[:end]
 
-    with open(postings_path, "wb", buffering=1024 * 1024) as postings_file:
         for postings in l_postings:
-            idf = math.log10(review_count / len(postings))
-            doc_ids, weights, l_positions = tuple(zip(*postings))
+            part_doc_ids, part_values, l_positions = tuple(zip(*postings))
+            self._write_positions(encode_positions(l_positions))
+            doc_ids.extend(part_doc_ids)
+            values.extend(part_values)
+
+            while len(doc_ids) >= POSTINGS_BLOCK_SIZE:
+                write_block(POSTINGS_BLOCK_SIZE)
+
+        if len(doc_ids) > 0:
+            write_block(len(doc_ids))
+
+        if posting_count > POSTINGS_BLOCK_SIZE:
+            byte_len += self._postings_file.write(skip_table)
+
+        return byte_len, max_weight
+
+    def _write_text_term(self, weighted_parts) -> Tuple[int, float]:
+        byte_len = self._postings_file.write(f"{self._positions_offset}|".encode("utf-8"))
+        prev_doc_id = 0
+        max_weight = 0.0
+        separator = ""
+
+        for doc_ids, weights, l_positions in weighted_parts:
+            doc_diffs = [doc_ids[0] - prev_doc_id] + [doc_ids[i+1] - doc_ids[i] for i in range(0, len(doc_ids)-1)]
+            postings_str = ";".join(f"{doc_diff}:{weight}" for doc_diff, weight in zip(doc_diffs, weights))
+            positions_str = ";".join(serialize_positions(positions) for positions in l_positions)
+            byte_len += self._postings_file.write(f"{separator}{postings_str}".encode("utf-8"))
+            self._write_positions(f"{separator}{positions_str}".encode("utf-8"))
+            prev_doc_id = doc_ids[-1]
+            max_weight = max(max_weight, max(weights))
+            separator = ";"
+
+        byte_len += self._postings_file.write(b"\n")
+        self._write_positions(b"\n")
+        return byte_len, max_weight
+
+    def close(self):
+        self._postings_file.close()
+
+        if self._positions_file is not None:
+            self._positions_file.close()
+
 
-            byte_len = postings_file.write(
-                f"{serial_as_posts_with_diffs(doc_ids, weights, l_positions)}\n".encode("utf-8")
-            )
+def _weighted_parts(l_postings: Iterable[Postings], weigh: TermWeigher):
+    for postings in l_postings:
+        doc_ids, values, l_positions = tuple(zip(*postings))
+        yield doc_ids, weigh(doc_ids, values), l_positions
 
-            results.append((idf, cur_offset, byte_len))
-            cur_offset += byte_len
 
-    return tuple(zip(*results))
+def idf_weighting(review_count: int) -> TermWeighting:
+    """
+    Keeps the weights of the blocks, which are the normalized term frequencies
+    of TF-IDF indexes and the term frequencies of BM25 TF indexes.
+    """
+    def term_weighting(posting_count: int) -> Tuple[float, TermWeigher]:
+        return math.log10(review_count / posting_count), lambda doc_ids, weights: weights
+
+    return term_weighting
 
 
-def write_bm25_postings(
-        postings_path: str,
-        l_postings: List[Postings],
-        *,
+def bm25_weighting(
         review_count: int,
         avg_dl: float,
-        document_lengths: List[int],
+        document_lengths: Sequence[int],
         b: float,
         k1: float
-):
-    cur_offset = 0
-    results = []
+) -> TermWeighting:
+    """
+    The weights of the blocks are the term frequencies. The length
+    normalization of each document, k1 * (1 - b + b * dl / avg_dl), doesn't
+    depend on the term, so it is computed once into a typed array and each
+    weight takes a lookup, an addition, two products and a division, with
+    the same operations in the same order as computing it whole. Parts of at
+    least BM25_VECTORIZE_MIN_POSTINGS postings are weighed with numpy when
+    it is available.
+    """
+    length_norms = array("d", (k1 * (1 - b + b * (doc_len / avg_dl)) for doc_len in document_lengths))
+    np_length_norms = np.frombuffer(length_norms, dtype=np.float64) if np is not None else None
+    k1_plus_1 = k1 + 1
 
-    with open(postings_path, "wb", buffering=1024 * 1024) as postings_file:
-        for postings in l_postings:
-            idf = math.log10(review_count / len(postings))
-            doc_ids, tfs, l_positions = tuple(zip(*postings))
-            doc_lens = [document_lengths[doc_id] for doc_id in doc_ids]
-            weights = [_bm25_weight(avg_dl, doc_len, b, k1, idf, tf) for doc_len, tf in zip(doc_lens, tfs)]
+    def term_weighting(posting_count: int) -> Tuple[float, TermWeigher]:
+        idf = math.log10(review_count / posting_count)
 
-            byte_len = postings_file.write(
-                f"{serial_as_posts_with_diffs(doc_ids, weights, l_positions)}\n".encode("utf-8")
-            )
+        def weigh(doc_ids: Sequence[DocId], tfs: Sequence[Weight]) -> List[Weight]:
+            if np_length_norms is not None and len(doc_ids) >= BM25_VECTORIZE_MIN_POSTINGS:
+                np_tfs = np.array(tfs, dtype=np.float64)
+                return (idf * (k1_plus_1 * np_tfs) / (np_length_norms[np.array(doc_ids)] + np_tfs)).tolist()
 
-            results.append((cur_offset, byte_len))
-            cur_offset += byte_len
+            return [idf * (k1_plus_1 * tf) / (length_norms[doc_id] + tf) for doc_id, tf in zip(doc_ids, tfs)]
 
-    return tuple(zip(*results))
+        return idf, weigh
 
+    return term_weighting
 
-def _bm25_weight(avg_dl: float, doc_len: int, b: float, k1: float, idf: float, tf: int):
-    b_normalizer = 1 - b + b * (doc_len / avg_dl)
-    return idf * ((k1 + 1) * tf) / (k1 * b_normalizer + tf)
 
+def read_postings(postings_data, codec: PostingsCodec = PostingsCodec.TEXT) -> PostingResults:
+    """
+    Decodes the doc ids and weights of the postings of a term.
+    Positions are not read, see 'read_positions'.
+    :param postings_data: bytes like object with the encoded postings. Usually
+    a memoryview over the memory mapped postings file of a segment.
+    :param codec:
+    :return:
+    """
+    if codec is PostingsCodec.VBYTE:
+        yield from decode_postings(postings_data)
+        return
 
-def read_postings(
-        segment_path: Path,
-        offset: Offset,
-        post_len: PostingLen
-) -> PostingResults:
     prev_doc_id = 0
+    # Indexes with the positions inline have no positions offset before the postings
+    postings_str = str(postings_data, "utf-8").strip().rpartition("|")[2]
+
+    for posting_str in postings_str.split(";"):
+        doc_id, weight = posting_str.split(":", 2)[:2]
+        prev_doc_id += int(doc_id)
+
+        yield prev_doc_id, float(weight)
 
-    with open(f"{segment_path}/postings.txt", "rb") as posts_file:
-        posts_file.seek(offset)
-        postings_data = posts_file.read(post_len).decode("utf-8").strip().split(";")
 
-        for posting_str in postings_data:
-            doc_id, weight, positions = deserialize_posting(posting_str)
+def read_positions(
+        postings_data,
+        positions_data,
+        codec: PostingsCodec = PostingsCodec.TEXT,
+        storage: PositionsStorage = PositionsStorage.INLINE
+) -> List[List[Position]]:
+    """
+    Decodes the positions of the postings of a term.
+    :param postings_data: bytes like object with the encoded postings.
+    :param positions_data: bytes like object with the positions file of the
+    segment. Not used when the positions are stored inline.
+    :param codec:
+    :param storage: How the index stores the positions.
+    :return: positions of each posting in doc id order.
+    """
+    if storage is PositionsStorage.NONE:
+        raise ValueError("The index was created without positions")
+
+    if codec is PostingsCodec.VBYTE:
+        return decode_positions(postings_data, positions_data)
+
+    postings_str = str(postings_data, "utf-8").strip()
+
+    if storage is PositionsStorage.INLINE:
+        return [deserialize_positions(posting_str.split(":")[2]) for posting_str in postings_str.split(";")]
 
-            yield doc_id + prev_doc_id, weight, positions
+    positions_offset = int(postings_str.partition("|")[0])
+    positions_end = positions_data.find(b"\n", positions_offset)
+    positions_str = str(positions_data[positions_offset:positions_end], "utf-8")
+    return [deserialize_positions(positions) for positions in positions_str.split(";")]
 
-            prev_doc_id += doc_id
+
+def read_postings_arrays(postings_data, codec: PostingsCodec = PostingsCodec.TEXT):
+    """
+    Decodes the doc ids and weights of a term into numpy arrays. Requires numpy.
+    :param postings_data: bytes like object with the encoded postings.
+    :param codec:
+    :return: int64 array of doc ids and float64 array of weights.
+    """
+    if codec is PostingsCodec.VBYTE:
+        count, _, blocks_start = _read_header(postings_data)
+        block_count = _block_count(count)
+
+        if block_count == 1:
+            weights = np.frombuffer(postings_data, dtype="<f4", count=count, offset=blocks_start)
+            data = np.frombuffer(postings_data, dtype=np.uint8, offset=blocks_start + 4 * count)
+            doc_ids = np.cumsum(decode_vbytes_array(data))
+            return doc_ids, weights.astype(np.float64)
+
+        skip_table = np.frombuffer(
+            postings_data, dtype=_skip_entry_dtype, count=block_count,
+            offset=len(postings_data) - block_count * _skip_entry.size
+        )
+        block_ends = skip_table["end"].astype(np.int64)
+        block_starts = np.concatenate(([blocks_start], block_ends[:-1]))
+        weights_ends = block_starts + 4 * np.minimum(
+            POSTINGS_BLOCK_SIZE, count - POSTINGS_BLOCK_SIZE * np.arange(block_count)
+        )
+        data = np.frombuffer(postings_data, dtype=np.uint8, count=block_ends[-1])
+        weights = data[_concat_ranges(block_starts, weights_ends)].view("<f4")
+        doc_ids = np.cumsum(decode_vbytes_array(data[_concat_ranges(weights_ends, block_ends)]))
+        return doc_ids, weights.astype(np.float64)
+
+    doc_ids, weights = zip(*read_postings(postings_data, codec))
+    return np.array(doc_ids, dtype=np.int64), np.array(weights, dtype=np.float64)
+
+
+def _concat_ranges(starts, ends):
+    """
+    Concatenation of the ranges [starts[i], ends[i]) as a numpy array.
+    """
+    lengths = ends - starts
+    range_offsets = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+    return np.arange(lengths.sum()) + range_offsets
@@ -0,0 +1,184 @@
+"""
+Module containing the IndexReader which keeps the files of an index
+open while it is being searched.
+"""
+import mmap
+import os
+from typing import Dict, List, Optional
+
+from definitions import DocId, Offset, Path, Position, PositionsStorage, PostingLen, PostingResults, ReviewId
+from store import doclengths, idxprops, reviews, segments
+from store.index import IndexDirectory
+from store.postings import POSITIONS_FILE_NAMES, POSTINGS_FILE_NAMES, PostingsCursor, postings_cursor, \
+    read_positions, read_postings, read_postings_arrays
+from store.vocabulary import VocabularyCache
+
+
+def _map_file(file_path: Path):
+    """
+    Memory maps a whole file for reading. Empty files can't be mapped
+    so empty bytes are returned for them instead.
+    :param file_path:
+    :return:
+    """
+    with open(file_path, "rb") as mapped_file:
+        try:
+            return mmap.mmap(mapped_file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            return b""
+
+
+class IndexReader:
+    def __init__(self, index_directory: IndexDirectory, vocabulary_cache_memory: int = 128 * 1024 * 1024):
+        """
+        Opens an index for searching. The postings file of every segment
+        and the review id files are memory mapped once
+        and kept open until 'close' is called, so reading the postings of a
+        term is a slice of memory instead of an open, a seek and a read. The positions files
+        are only mapped the first time the positions of a segment are read.
+        :param index_directory:
+        :param vocabulary_cache_memory: Memory budget of the vocabulary cache.
+        """
+        self.index_directory = index_directory
+        self.properties = idxprops.read_props(index_directory.idx_props_path)
+        self.segments = segments.read_segments(index_directory.segments_dir_path)
+        self.vocabulary_cache = VocabularyCache(vocabulary_cache_memory)
+
+        postings_file_name = POSTINGS_FILE_NAMES[self.properties.postings_codec]
+        self._postings_files: Dict[Path, mmap.mmap] = {
+            segment_path: _map_file(f"{segment_path}/{postings_file_name}")
+            for _, _, segment_path in self.segments
+        }
+        self._postings_views: Dict[Path, memoryview] = {
+            segment_path: memoryview(postings_file)
+            for segment_path, postings_file in self._postings_files.items()
+        }
+
+        self._positions_files: Dict[Path, mmap.mmap] = {}
+
+        self._review_ids_file = _map_file(index_directory.review_ids_path)
+        self._review_offsets_file = b""
+
+        # Indexes created before the offsets file have their offsets found by reading the review ids
+        if os.path.exists(index_directory.review_offsets_path):
+            self._review_offsets_file = _map_file(index_directory.review_offsets_path)
+            self._review_offsets = reviews.integers_view(self._review_offsets_file)
+        else:
+            self._review_offsets = reviews.load_review_offsets(index_directory.review_ids_path)
+
+        self._review_id_order_file = b""
+        self._review_id_order = None
+
+        if os.path.exists(index_directory.review_id_order_path):
+            self._review_id_order_file = _map_file(index_directory.review_id_order_path)
+            self._review_id_order = reviews.integers_view(self._review_id_order_file)
+
+        # Only the indexes that compute the BM25 weights while searching store the document lengths
+        self._document_lengths_file = b""
+
+        if os.path.exists(index_directory.document_lengths_path):
+            self._document_lengths_file = _map_file(index_directory.document_lengths_path)
+
+        self.document_lengths = doclengths.document_lengths_view(self._document_lengths_file)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def postings_data(self, segment_path: Path, offset: Offset, post_len: PostingLen) -> memoryview:
+        """
+        Returns a zero copy view over the encoded postings of a term.
+        :param segment_path:
+        :param offset:
+        :param post_len:
+        :return:
+        """
+        return self._postings_views[segment_path][offset:offset + post_len]
+
+    def read_postings(self, segment_path: Path, offset: Offset, post_len: PostingLen) -> PostingResults:
+        return read_postings(self.postings_data(segment_path, offset, post_len), self.properties.postings_codec)
+
+    def read_postings_arrays(self, segment_path: Path, offset: Offset, post_len: PostingLen):
+        return read_postings_arrays(
+            self.postings_data(segment_path, offset, post_len),
+            self.properties.postings_codec
+        )
+
+    def postings_cursor(self, segment_path: Path, offset: Offset, post_len: PostingLen) -> PostingsCursor:
+        return postings_cursor(
+            self.postings_data(segment_path, offset, post_len),
+            self.properties.postings_codec
+        )
+
+    def read_positions(self, segment_path: Path, offset: Offset, post_len: PostingLen) -> List[List[Position]]:
+        """
+        Reads the positions of the postings of a term.
+        Raises ValueError if the index was created without positions.
+        :param segment_path:
+        :param offset:
+        :param post_len:
+        :return: positions of each posting in doc id order.
+        """
+        storage = self.properties.positions_storage
+        positions_file = b""
+
+        if storage is PositionsStorage.SEPARATE:
+            if segment_path not in self._positions_files:
+                positions_file_name = POSITIONS_FILE_NAMES[self.properties.postings_codec]
+                self._positions_files[segment_path] = _map_file(f"{segment_path}/{positions_file_name}")
+
+            positions_file = self._positions_files[segment_path]
+
+        return read_positions(
+            self.postings_data(segment_path, offset, post_len),
+            positions_file,
+            self.properties.postings_codec,
+            storage
+        )
+
+    def read_review_id(self, doc_id: DocId) -> ReviewId:
+        return reviews.read_review_id(self._review_ids_file, self._review_offsets, doc_id)
+
+    def read_review_ids(self, doc_ids: List[DocId]) -> List[ReviewId]:
+        return reviews.read_review_ids(self._review_ids_file, self._review_offsets, doc_ids)
+
+    def find_doc_id(self, review_id: ReviewId) -> Optional[DocId]:
+        """
+        :param review_id:
+        :return: doc id of 'review_id' or None if it isn't in the index.
+        """
+        # Indexes created before the review id order file sort their review ids on the first lookup
+        if self._review_id_order is None:
+            self._review_id_order = reviews.sort_review_ids(self._review_ids_file)
+
+        return reviews.find_doc_id(self._review_ids_file, self._review_offsets, self._review_id_order, review_id)
+
+    def find_doc_ids(self, review_ids: List[ReviewId]) -> List[Optional[DocId]]:
+        return [self.find_doc_id(review_id) for review_id in review_ids]
+
+    def close(self):
+        for postings_view in self._postings_views.values():
+            postings_view.release()
+
+        for mapped_file in (*self._postings_files.values(), *self._positions_files.values()):
+            if isinstance(mapped_file, mmap.mmap):
+                mapped_file.close()
+
+        if isinstance(self._review_ids_file, mmap.mmap):
+            self._review_ids_file.close()
+
+        # The views have to go before the files they were made from are closed
+        self._review_offsets = None
+        self._review_id_order = None
+        self.document_lengths = None
+
+        for mapped_file in (self._review_offsets_file, self._review_id_order_file, self._document_lengths_file):
+            if isinstance(mapped_file, mmap.mmap):
+                mapped_file.close()
+
+        self._postings_views = {}
+        self._postings_files = {}
+        self._positions_files = {}
+        self.vocabulary_cache.close()
@@ -1,34 +1,181 @@
-from typing import List, Tuple, BinaryIO
+"""
+Module handling the review ids of an index. The review ids are written to
+a text file, one per line in doc id order, and the offset of each line is
+written to an offsets file as little endian 32 bit integers, followed by
+the offset of the end of the review ids file. The offsets file is memory
+mapped while searching, so the review id of a doc id is a slice of the
+review ids file found without parsing either file.
 
-from definitions import ReviewId, Offset, Length, DocId
+The review id order file holds the doc ids sorted by their review ids, as
+little endian 32 bit integers, so the doc id of a review id is found with
+a binary search over the memory mapped files.
+"""
+import sys
+from array import array
+from typing import List, Optional, Sequence
 
+from definitions import ReviewId, DocId
 
-def write_review_ids(review_ids_path: str, review_ids: List[ReviewId]):
-    with open(review_ids_path, "a", encoding="utf-8") as review_ids_file:
-        review_ids_file.writelines(f"{review_id}\n" for review_id in review_ids)
+try:
+    import numpy as np
+except ImportError:  # numpy is optional, the files are also read as memoryviews
+    np = None
 
 
-def review_id_reader(review_ids_path: str):
-    locations = _load_review_ids_locations(review_ids_path)
+def write_review_ids(review_ids_path: str, review_offsets_path: str, review_ids: List[ReviewId]):
+    """
+    Appends review ids to the review ids file and their offsets to the offsets file.
+    :param review_ids_path:
+    :param review_offsets_path:
+    :param review_ids: review ids of the next doc ids.
+    """
+    with open(review_ids_path, "ab") as review_ids_file, open(review_offsets_path, "ab") as review_offsets_file:
+        data = bytearray()
+        end_offsets = array("I")
+        offset = review_ids_file.tell()
 
-    def read_review_id(review_file: BinaryIO, doc_id: DocId):
-        # print(f"[reviews]: Getting review id for {doc_id}")
-        offset, length = locations[doc_id]
-        review_file.seek(offset)
-        review_id = review_file.read(length).decode("utf-8").strip()
-        # print(f"[reviews]: Found review id '{review_id}'")
-        return review_id
+        # The offsets file starts with the offset of the first review id
+        if review_offsets_file.tell() == 0:
+            end_offsets.append(offset)
 
-    return read_review_id
+        for review_id in review_ids:
+            data += f"{review_id}\n".encode("utf-8")
+            end_offsets.append(offset + len(data))
 
+        if sys.byteorder != "little":
+            end_offsets.byteswap()
 
-def _load_review_ids_locations(review_ids_path: str) -> List[Tuple[Offset, Length]]:
-    locations = []
+        review_ids_file.write(data)
+        end_offsets.tofile(review_offsets_file)
+
+
+def integers_view(file_data):
+    """
+    :param file_data: bytes like object with the offsets file or the review
+    id order file. Usually the file memory mapped.
+    :return: a sequence of the integers of the file, which is a numpy array
+    when numpy is available.
+    """
+    if np is not None:
+        return np.frombuffer(file_data, dtype="<u4")
+
+    if sys.byteorder != "little":
+        integers = array("I", bytes(file_data))
+        integers.byteswap()
+        return integers
+
+    return memoryview(file_data).cast("I")
+
+
+def load_review_offsets(review_ids_path: str) -> array:
+    """
+    Finds the offsets of the review ids of an index created without the
+    offsets file by reading the whole review ids file.
+    :param review_ids_path:
+    :return: the offsets as they would be in the offsets file.
+    """
+    review_offsets = array("I", [0])
     offset = 0
-    with open(review_ids_path, encoding="utf-8", newline="\n") as review_id_file:
-        for entry in review_id_file:
-            length = len(entry.encode("utf-8"))
-            locations.append((offset, length))
-            offset += length
 
-    return locations
+    with open(review_ids_path, "rb") as review_ids_file:
+        for entry in review_ids_file:
+            offset += len(entry)
+            review_offsets.append(offset)
+
+    return review_offsets
+
+
+def sort_review_ids(review_ids_data) -> array:
+    """
+    :param review_ids_data: bytes like object with the contents of the review ids file.
+    :return: the doc ids sorted by their review ids.
+    """
+    review_ids = bytes(review_ids_data).split(b"\n")[:-1]
+
+    # Fixed width byte strings sort like the review ids with a fraction of their memory
+    if np is not None and len(review_ids) != 0:
+        return array("I", np.argsort(np.array(review_ids), kind="stable").astype(np.uint32).tobytes())
+
+    return array("I", sorted(range(len(review_ids)), key=review_ids.__getitem__))
+
+
+def write_review_id_order(review_ids_path: str, review_id_order_path: str):
+    """
+    Writes the review id order file of the review ids of an index.
+    :param review_ids_path:
+    :param review_id_order_path:
+    """
+    with open(review_ids_path, "rb") as review_ids_file:
+        review_id_order = sort_review_ids(review_ids_file.read())
+
+    if sys.byteorder != "little":
+        review_id_order.byteswap()
+
+    with open(review_id_order_path, "wb") as review_id_order_file:
+        review_id_order.tofile(review_id_order_file)
+
+
+def find_doc_id(
+        review_ids_data,
+        review_offsets: Sequence[int],
+        review_id_order: Sequence[int],
+        review_id: ReviewId
+) -> Optional[DocId]:
+    """
+    :param review_ids_data: bytes like object with the contents of the review ids file.
+    :param review_offsets:
+    :param review_id_order: doc ids sorted by their review ids.
+    :param review_id:
+    :return: doc id of 'review_id' or None if it isn't in the index.
+    """
+    review_id_bytes = review_id.encode("utf-8")
+    low, high = 0, len(review_id_order)
+
+    while low < high:
+        middle = (low + high) // 2
+        doc_id = review_id_order[middle]
+
+        if review_ids_data[review_offsets[doc_id]:review_offsets[doc_id + 1] - 1] < review_id_bytes:
+            low = middle + 1
+        else:
+            high = middle
+
+    if low < len(review_id_order):
+        doc_id = int(review_id_order[low])
+
+        if review_ids_data[review_offsets[doc_id]:review_offsets[doc_id + 1] - 1] == review_id_bytes:
+            return doc_id
+
+    return None
+
+
+def read_review_id(review_ids_data, review_offsets: Sequence[int], doc_id: DocId) -> ReviewId:
+    """
+    :param review_ids_data: bytes like object with the contents of the review ids file.
+    Usually the review ids file memory mapped.
+    :param review_offsets:
+    :param doc_id:
+    :return:
+    """
+    # The end offset of a review id is past its line break
+    return str(review_ids_data[review_offsets[doc_id]:review_offsets[doc_id + 1] - 1], "utf-8")
+
+
+def read_review_ids(review_ids_data, review_offsets: Sequence[int], doc_ids: List[DocId]) -> List[ReviewId]:
+    """
+    Reads the review ids of many doc ids at once, looking all their offsets
+    up in a single step when the offsets are a numpy array.
+    :param review_ids_data:
+    :param review_offsets:
+    :param doc_ids:
+    :return: review id of each doc id in the order of 'doc_ids'.
+    """
+    if np is not None and isinstance(review_offsets, np.ndarray):
+        doc_ids = np.asarray(doc_ids, dtype=np.int64)
+        starts = review_offsets[doc_ids].tolist()
+        ends = review_offsets[doc_ids + 1].tolist()
+    else:
+        starts = [review_offsets[doc_id] for doc_id in doc_ids]
+        ends = [review_offsets[doc_id + 1] for doc_id in doc_ids]
+
+    return [str(review_ids_data[start:end - 1], "utf-8") for start, end in zip(starts, ends)]
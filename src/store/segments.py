@@ -1,84 +1,93 @@
 import os
-from typing import List
+from typing import Iterable, List, Optional, Sequence, Tuple
 
-from definitions import TermPostingsEntry, Segment, PostsFormat, VocabFormat, SegmentFormat
+from definitions import Segment, SegmentFormat, PostingsCodec, Postings, Term, TermWeighting
 
 from store import postings
 from store import vocabulary
 from store.index import IndexDirectory
 
 
-def segment_formatter(postings_write: PostsFormat, vocab_write: VocabFormat, **props):
-    def write_segment(
-            vocab_path: str,
-            postings_path: str,
-            entries: List[TermPostingsEntry]
-    ):
-        terms, l_postings = tuple(zip(*entries))
-        offsets = postings_write(postings_path, l_postings, **props)
-        vocab_write(vocab_path, terms, *offsets)
+def segment_formatter(term_weighting: TermWeighting, codec: PostingsCodec) -> SegmentFormat:
+    def open_postings_writer(postings_path: str, positions_path: Optional[str]) -> postings.PostingsWriter:
+        return postings.PostingsWriter(postings_path, positions_path, term_weighting, codec)
 
-    return write_segment
+    return open_postings_writer
 
 
-class BufferedSegmentWriter:
+class SegmentWriter:
     def __init__(
             self, segment_format: SegmentFormat, index_directory: IndexDirectory,
             n_terms_per_seg=50000,
     ):
+        """
+        Writes the merged postings into segments of 'n_terms_per_seg' terms.
+        The postings of each term go straight to the postings file of the
+        segment, and only the vocabulary entries of the segment are kept
+        until it is complete.
+        :param segment_format:
+        :param index_directory:
+        :param n_terms_per_seg:
+        """
         self.index_dir = index_directory
-        self.write_segment = segment_format
+        self.open_postings_writer = segment_format
 
-        self.posts_buffer: List[TermPostingsEntry] = []
+        self.segment_paths: Optional[Tuple[str, str, str, Optional[str]]] = None
+        self.postings_writer: Optional[postings.PostingsWriter] = None
+        self.terms: List[Term] = []
+        self.vocabulary_entries: List[Tuple[float, int, int, int, float]] = []
         self.n_terms_per_seg = n_terms_per_seg
-        self.buffer_count = 0
         self.term_count = 0
+        self.posting_count = 0
 
-    def write(self, entry: TermPostingsEntry):
-        if self.buffer_count < self.n_terms_per_seg:
-            self.posts_buffer.append(entry)
-            self.buffer_count += 1
-            self.term_count += 1
-        else:
+    def write(self, term: Term, posting_count: int, l_postings: Iterable[Postings]):
+        if len(self.terms) >= self.n_terms_per_seg:
             self.flush()
-            self.posts_buffer.append(entry)
+
+        if self.postings_writer is None:
+            self.segment_paths = self.index_dir.make_segment_dir(term)
+            segment_path, _, postings_path, positions_path = self.segment_paths
+            print(f"[SegmentWriter] Writing segment {segment_path}")
+            self.postings_writer = self.open_postings_writer(postings_path, positions_path)
+
+        self.terms.append(term)
+        self.vocabulary_entries.append(self.postings_writer.write(posting_count, l_postings))
+        self.term_count += 1
+        self.posting_count += posting_count
 
     def flush(self):
-        first_term = self.posts_buffer[0][0]
-        last_term = self.posts_buffer[-1][0]
-        segment_path, vocab_path, postings_path = self.index_dir.make_segment_dir(first_term, last_term)
+        if self.postings_writer is None:
+            return
 
-        print(f"[SegmentWriter] Writing segment {segment_path}")
-        self.write_segment(vocab_path, postings_path, self.posts_buffer)
+        self.postings_writer.close()
+        _, vocab_path, _, _ = self.segment_paths
+        vocabulary.write_vocabulary(vocab_path, self.terms, *zip(*self.vocabulary_entries))
+        segment_path, _, _, _ = self.index_dir.close_segment_dir(self.segment_paths, self.terms[-1])
         print(f"[SegmentWriter] Finished writing {segment_path}")
 
-        self.posts_buffer = []
-        self.buffer_count = 0
+        self.segment_paths = None
+        self.postings_writer = None
+        self.terms = []
+        self.vocabulary_entries = []
+
+
+def tf_idf_format(review_count: int, codec: PostingsCodec):
+    return segment_formatter(postings.idf_weighting(review_count), codec)
 
 
-def tf_idf_format(review_count: int):
-    return segment_formatter(
-        postings.write_tf_idf_postings,
-        vocabulary.write_tf_idf_vocabulary,
-        review_count=review_count
-    )
+def bm25_tf_format(review_count: int, codec: PostingsCodec):
+    return segment_formatter(postings.idf_weighting(review_count), codec)
 
 
 def bm25_format(
         review_count: int,
         avg_dl: float,
-        document_lengths: List[int],
+        document_lengths: Sequence[int],
         b: float,
-        k1: float
+        k1: float,
+        codec: PostingsCodec
 ):
-    return segment_formatter(
-        postings.write_bm25_postings,
-        vocabulary.write_bm25_vocabulary,
-        review_count=review_count,
-        avg_dl=avg_dl,
-        document_lengths=document_lengths,
-        b=b, k1=k1
-    )
+    return segment_formatter(postings.bm25_weighting(review_count, avg_dl, document_lengths, b, k1), codec)
 
 
 def read_segments(segments_dir_path: str) -> List[Segment]:
@@ -0,0 +1,98 @@
+"""
+Module containing the variable byte integer codec used by the binary
+index formats. Each integer is split into groups of 7 bits, least
+significant group first, and every byte but the last one of an
+integer has its high bit set.
+"""
+from typing import Iterable, List, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional, only the array decoders need it
+    np = None
+
+
+def encode_vbyte(value: int, out: bytearray):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+
+    out.append(value)
+
+
+def encode_vbytes(values: Iterable[int], out: bytearray):
+    for value in values:
+        while value >= 0x80:
+            out.append((value & 0x7F) | 0x80)
+            value >>= 7
+
+        out.append(value)
+
+
+def decode_vbyte(data, position: int) -> Tuple[int, int]:
+    """
+    Decodes a single integer starting at 'position'.
+    :param data: bytes like object
+    :param position:
+    :return: the integer and the position of the byte following it.
+    """
+    value = 0
+    shift = 0
+
+    while True:
+        byte = data[position]
+        position += 1
+        value |= (byte & 0x7F) << shift
+
+        if byte < 0x80:
+            return value, position
+
+        shift += 7
+
+
+def decode_vbytes(data, position: int, count: int) -> Tuple[List[int], int]:
+    """
+    Decodes 'count' integers starting at 'position'.
+    :param data: bytes like object
+    :param position:
+    :param count:
+    :return: the integers and the position of the byte following the last one.
+    """
+    values = []
+    value = 0
+    shift = 0
+
+    while len(values) < count:
+        byte = data[position]
+        position += 1
+
+        if byte < 0x80:
+            values.append(value | (byte << shift))
+            value = 0
+            shift = 0
+        else:
+            value |= (byte & 0x7F) << shift
+            shift += 7
+
+    return values, position
+
+
+def decode_vbytes_array(data) -> "np.ndarray":
+    """
+    Decodes every integer in 'data' at once with numpy.
+    :param data: uint8 numpy array holding whole integers only.
+    :return: int64 numpy array with the decoded integers.
+    """
+    if len(data) == 0 or data.max() < 0x80:
+        return data.astype(np.int64)
+
+    ends = np.flatnonzero(data < 0x80)
+    starts = np.empty_like(ends)
+    starts[0] = 0
+    starts[1:] = ends[:-1] + 1
+
+    integer_of_byte = np.repeat(np.arange(len(ends)), ends - starts + 1)
+    shifts = (np.arange(len(data)) - starts[integer_of_byte]) * 7
+    groups = (data & 0x7F).astype(np.int64) << shifts
+
+    return np.add.reduceat(groups, starts)
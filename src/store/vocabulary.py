@@ -1,90 +1,303 @@
-from typing import List, Optional, Tuple
+import math
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import List, Optional, Tuple, Union
+
+from definitions import Segment, Term, BM25Metadata, IdfMetadata, Path, VocabularyEntry
+
+
+# Binary vocabulary layout (all integers are little endian):
+#   header:        magic, version, terms per block, term count, block count
+#   entries table: one fixed width (offset, length, df, idf, max weight) entry per term
+#   blocks table:  offset of each front coded block inside the terms section
+#   terms section: blocks of front coded terms. The first term of a block is
+#                  stored whole as (length, bytes) and the following ones
+#                  as (shared prefix length, suffix length, suffix bytes).
+_VOCAB_MAGIC = b"IRVB"
+_VOCAB_VERSION = 2
+_vocab_header = struct.Struct("<4sHHII")
+_vocab_entry = struct.Struct("<QIIdd")
+_block_offset = struct.Struct("<I")
+
+TERMS_PER_BLOCK = 16
+
+
+def write_vocabulary(
+        vocab_path: str, terms: List[Term], idfs: List[float],
+        offsets: List[int], lengths: List[int], dfs: List[int],
+        max_weights: List[float]
+):
+    terms_section = bytearray()
+    block_offsets = []
+    prev_term = b""
 
-from definitions import Segment, Term, BM25Metadata, IdfMetadata, Path
+    for i, term in enumerate(terms):
+        term_bytes = term.encode("utf-8")
 
+        if i % TERMS_PER_BLOCK == 0:
+            block_offsets.append(len(terms_section))
+            terms_section.append(len(term_bytes))
+            terms_section += term_bytes
+        else:
+            prefix_len = _common_prefix_length(prev_term, term_bytes)
+            terms_section.append(prefix_len)
+            terms_section.append(len(term_bytes) - prefix_len)
+            terms_section += term_bytes[prefix_len:]
+
+        prev_term = term_bytes
+
+    with open(vocab_path, "wb", buffering=1024 * 1024) as vocab_file:
+        vocab_file.write(_vocab_header.pack(
+            _VOCAB_MAGIC, _VOCAB_VERSION, TERMS_PER_BLOCK, len(terms), len(block_offsets)
+        ))
+
+        for entry in zip(offsets, lengths, dfs, idfs, max_weights):
+            vocab_file.write(_vocab_entry.pack(*entry))
+
+        vocab_file.write(struct.pack(f"<{len(block_offsets)}I", *block_offsets))
+        vocab_file.write(terms_section)
+
+
+def _common_prefix_length(first: bytes, second: bytes) -> int:
+    max_len = min(len(first), len(second))
+    prefix_len = 0
+
+    while prefix_len < max_len and first[prefix_len] == second[prefix_len]:
+        prefix_len += 1
+
+    return prefix_len
+
+
+class SegmentVocabulary:
+    def __init__(self, terms: List[Term], idfs: array, offsets: array, lengths: array):
+        """
+        Vocabulary of a single segment held in memory as parallel arrays
+        sorted by term. This is how vocabularies of indexes written in the
+        text format are loaded. BM25 vocabularies have no idfs and leave that array empty.
+        :param terms:
+        :param idfs:
+        :param offsets:
+        :param lengths:
+        """
+        self.terms = terms
+        self.idfs = idfs
+        self.offsets = offsets
+        self.lengths = lengths
+        self.size_in_bytes = (
+            sys.getsizeof(terms) + sum(sys.getsizeof(term) for term in terms) +
+            sys.getsizeof(idfs) + sys.getsizeof(offsets) + sys.getsizeof(lengths)
+        )
+
+    def find(self, term: Term) -> Optional[VocabularyEntry]:
+        """
+        Text vocabularies do not record the document frequency nor the
+        maximum weight of the terms so they are returned as 0 and infinity.
+        :param term:
+        :return:
+        """
+        idx = bisect_left(self.terms, term)
+
+        if idx == len(self.terms) or self.terms[idx] != term:
+            return None
 
-def serialize_tf_idf_metadata(term: str, idf: float, offset: int, byte_len: int):
-    return f"{term}:{idf}:{offset}:{byte_len}\n"
+        idf = self.idfs[idx] if len(self.idfs) > 0 else 0.0
+        return idf, self.offsets[idx], self.lengths[idx], 0, math.inf
 
+    def close(self):
+        pass
 
-def deserialize_tf_idf_metadata(data: str) -> IdfMetadata:
-    term, idf, offset, byte_len = data.split(":")
-    return term, float(idf), int(offset), int(byte_len)
 
+class BinarySegmentVocabulary:
+    def __init__(self, vocab_path: Path):
+        """
+        Vocabulary of a single segment written in the binary format.
+        The file is memory mapped and searched in place, so opening
+        it costs nothing besides the pages touched by the lookups.
+        :param vocab_path:
+        """
+        with open(vocab_path, "rb") as vocab_file:
+            self._data = mmap.mmap(vocab_file.fileno(), 0, access=mmap.ACCESS_READ)
 
-def serialize_bm25_metadata(term: str, offset: int, byte_len: int):
-    return f"{term}:{offset}:{byte_len}\n"
+        magic, version, terms_per_block, term_count, block_count = _vocab_header.unpack_from(self._data, 0)
 
+        if magic != _VOCAB_MAGIC or version != _VOCAB_VERSION:
+            self._data.close()
+            raise ValueError(f"'{vocab_path}' is not a version {_VOCAB_VERSION} binary vocabulary")
 
-def deserialize_bm25_metadata(data: str) -> BM25Metadata:
-    term, offset, byte_len = data.split(":")
-    return term, int(offset), int(byte_len)
+        self.terms_per_block = terms_per_block
+        self.term_count = term_count
+        self.block_count = block_count
+        self.entries_offset = _vocab_header.size
+        self.blocks_offset = self.entries_offset + term_count * _vocab_entry.size
+        self.terms_offset = self.blocks_offset + block_count * _block_offset.size
+        self.size_in_bytes = sys.getsizeof(self)
 
+    def find(self, term: Term) -> Optional[VocabularyEntry]:
+        idx = _find_metadata(self, term.encode("utf-8"))
 
-def write_tf_idf_vocabulary(
-        vocab_path: str, terms: list[str], idfs: list[float],
-        offsets: list[int], lengths: list[int]
-):
-    with open(vocab_path, "w", encoding="utf-8", newline="\n") as vocab_file:
-        for term, idf, offset, length in zip(terms, idfs, offsets, lengths):
-            vocab_file.write(serialize_tf_idf_metadata(term, idf, offset, length))
+        if idx is None:
+            return None
+
+        offset, length, df, idf, max_weight = _vocab_entry.unpack_from(
+            self._data, self.entries_offset + idx * _vocab_entry.size
+        )
+        return idf, offset, length, df, max_weight
+
+    def block_first_term(self, block: int) -> Tuple[bytes, int]:
+        """
+        Returns the first term of the block and the position where the next term starts.
+        :param block:
+        :return:
+        """
+        (block_offset,) = _block_offset.unpack_from(self._data, self.blocks_offset + block * _block_offset.size)
+        position = self.terms_offset + block_offset
+        term_len = self._data[position]
+        return self._data[position + 1:position + 1 + term_len], position + 1 + term_len
+
+    def next_term(self, prev_term: bytes, position: int) -> Tuple[bytes, int]:
+        prefix_len = self._data[position]
+        suffix_len = self._data[position + 1]
+        suffix_end = position + 2 + suffix_len
+        return prev_term[:prefix_len] + self._data[position + 2:suffix_end], suffix_end
+
+    def close(self):
+        self._data.close()
+
+
+AnySegmentVocabulary = Union[SegmentVocabulary, BinarySegmentVocabulary]
+
+
+class VocabularyCache:
+    def __init__(self, max_bytes: int = 128 * 1024 * 1024):
+        """
+        Keeps the vocabularies of recently used segments in memory so that
+        each vocabulary file is parsed once instead of once per term lookup.
+        Whole segments are evicted in least recently used order once
+        the estimated size of the loaded vocabularies goes over 'max_bytes'.
+        The most recently used segment is always kept.
+        Binary vocabularies are memory mapped and barely count towards the budget.
+        :param max_bytes: Memory budget for the loaded vocabularies.
+        """
+        self.max_bytes = max_bytes
+        self.used_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._vocabularies: OrderedDict[Path, AnySegmentVocabulary] = OrderedDict()
+
+    def get(self, segment_path: Path) -> AnySegmentVocabulary:
+        vocabulary = self._vocabularies.get(segment_path)
+
+        if vocabulary is not None:
+            self.hits += 1
+            self._vocabularies.move_to_end(segment_path)
+            return vocabulary
+
+        self.misses += 1
+        vocabulary = read_segment_vocabulary(segment_path)
+        self._vocabularies[segment_path] = vocabulary
+        self.used_bytes += vocabulary.size_in_bytes
+
+        while self.used_bytes > self.max_bytes and len(self._vocabularies) > 1:
+            _, evicted = self._vocabularies.popitem(last=False)
+            self.used_bytes -= evicted.size_in_bytes
+            self.evictions += 1
+            evicted.close()
+
+        return vocabulary
+
+    def close(self):
+        for vocabulary in self._vocabularies.values():
+            vocabulary.close()
+
+        self._vocabularies.clear()
+        self.used_bytes = 0
+
+    def statistics(self) -> str:
+        lookups = self.hits + self.misses
+        hit_rate = self.hits / lookups if lookups > 0 else 0.0
+        return (
+            f"hits={self.hits} misses={self.misses} hit_rate={hit_rate:.2%} "
+            f"evictions={self.evictions} segments={len(self._vocabularies)} "
+            f"used={self.used_bytes / 1024 / 1024:.2f}MB/{self.max_bytes / 1024 / 1024:.2f}MB"
+        )
+
+
+def read_segment_vocabulary(segment_path: Path) -> AnySegmentVocabulary:
+    """
+    Opens the vocabulary of a segment. Segments of indexes
+    created before the binary format was introduced only
+    have a vocabulary.txt which is parsed into memory.
+    :param segment_path:
+    :return:
+    """
+    if os.path.isfile(f"{segment_path}/vocabulary.bin"):
+        return BinarySegmentVocabulary(f"{segment_path}/vocabulary.bin")
 
+    terms = []
+    idfs = array("d")
+    offsets = array("q")
+    lengths = array("q")
+
+    with open(f"{segment_path}/vocabulary.txt", encoding="utf-8") as vocab_file:
+        for vocab_entry in vocab_file:
+            term, *metadata = vocab_entry.rstrip("\n").split(":")
+            terms.append(term)
+            offsets.append(int(metadata[-2]))
+            lengths.append(int(metadata[-1]))
+
+            if len(metadata) == 3:
+                idfs.append(float(metadata[0]))
+
+    return SegmentVocabulary(terms, idfs, offsets, lengths)
 
-def write_bm25_vocabulary(
-        vocab_path: str, terms: list[str],
-        offsets: list[int], lengths: list[int]
-):
-    with open(vocab_path, "w", encoding="utf-8", newline="\n") as vocab_file:
-        for term, offset, length in zip(terms, offsets, lengths):
-            vocab_file.write(serialize_bm25_metadata(term, offset, length))
 
+def bm25_metadata_reader(segments: List[Segment], vocabulary_cache: Optional[VocabularyCache] = None):
+    vocabulary_cache = VocabularyCache() if vocabulary_cache is None else vocabulary_cache
 
-def bm25_metadata_reader(segments: List[Segment]):
     def read(term: Term) -> Optional[BM25Metadata]:
-        # print(f"[vocabulary]: Searching for term '{term}'")
-        metadata = _get_metadata(segments, term)
-        # print(f"[vocabulary] Found metadata {metadata}")
+        metadata = _get_metadata(segments, vocabulary_cache, term)
 
         if metadata is None:
             return None
 
-        segment_path, term_metadata = metadata
-
-        offset_str, post_len_str = term_metadata.split(":")
-        return segment_path, int(offset_str), int(post_len_str)
+        segment_path, (_, offset, post_len, _, max_weight) = metadata
+        return segment_path, offset, post_len, max_weight
 
     return read
 
 
-def tf_idf_metadata_reader(segments: List[Segment]):
+def tf_idf_metadata_reader(segments: List[Segment], vocabulary_cache: Optional[VocabularyCache] = None):
+    vocabulary_cache = VocabularyCache() if vocabulary_cache is None else vocabulary_cache
+
     def read(term: Term) -> Optional[IdfMetadata]:
-        # print(f"[vocabulary]: Searching for term '{term}'")
-        metadata = _get_metadata(segments, term)
-        # print(f"[vocabulary] Found metadata {metadata}")
+        metadata = _get_metadata(segments, vocabulary_cache, term)
 
         if metadata is None:
             return None
 
-        segment_path, term_metadata = metadata
-
-        idf_str, offset_str, post_len_str = term_metadata.split(":")
-
-        return segment_path, float(idf_str), int(offset_str), int(post_len_str)
+        segment_path, (idf, offset, post_len, _, _) = metadata
+        return segment_path, idf, offset, post_len
 
     return read
 
 
-def _get_metadata(segments: List[Segment], term: Term) -> Optional[Tuple[Path, str]]:
+def _get_metadata(
+        segments: List[Segment],
+        vocabulary_cache: VocabularyCache,
+        term: Term
+) -> Optional[Tuple[Path, VocabularyEntry]]:
     segment_path = _find_segment(segments, term)
-    # print(f"[vocabulary]: Found segment '{segment_path}'")
 
     if segment_path is None:
         return None
 
-    with open(f"{segment_path}/vocabulary.txt", encoding="utf-8") as vocab_file:
-        vocabulary_entries = [vocab_entry.strip().split(":", 1) for vocab_entry in vocab_file]
-
-    metadata = _find_metadata(vocabulary_entries, term)
+    metadata = vocabulary_cache.get(segment_path).find(term)
 
     if metadata is None:
         return None
@@ -118,28 +331,49 @@ def _find_segment(segments: List[Segment], term: Term) -> Optional[Path]:
     return None
 
 
-def _find_metadata(vocabulary_entries: List[Tuple[Term, str]], term: Term) -> Optional[str]:
+def _find_metadata(vocabulary: BinarySegmentVocabulary, term: bytes) -> Optional[int]:
     """
-    Taking an ordered list of terms and a term to search
-    this function returns the metadata of the term in the vocabulary
-    if it is found. Otherwise it returns None.
+    Taking a binary vocabulary and a term to search this function returns
+    the index of the term in the vocabulary entries table if it is found.
+    Otherwise it returns None. The block whose first term is the last one
+    not greater than the searched term is binary searched and then its
+    front coded terms are decoded until the term is found or passed.
 
     Algorithm from https://en.wikipedia.org/wiki/Binary_search_algorithm#Procedure
-    :param vocabulary_entries:
+    :param vocabulary:
     :param term:
     :return:
     """
     left = 0
-    right = len(vocabulary_entries) - 1
+    right = vocabulary.block_count - 1
+    block = -1
 
     while left <= right:
         mid = (left + right) // 2
+        first_term, _ = vocabulary.block_first_term(mid)
 
-        if vocabulary_entries[mid][0] < term:
+        if first_term < term:
+            block = mid
             left = mid + 1
-        elif vocabulary_entries[mid][0] > term:
+        elif first_term > term:
             right = mid - 1
         else:
-            return vocabulary_entries[mid][1]
+            return mid * vocabulary.terms_per_block
+
+    if block == -1:
+        return None
+
+    idx = block * vocabulary.terms_per_block
+    last_idx = min(idx + vocabulary.terms_per_block, vocabulary.term_count) - 1
+    block_term, position = vocabulary.block_first_term(block)
+
+    while idx < last_idx:
+        block_term, position = vocabulary.next_term(block_term, position)
+        idx += 1
+
+        if block_term == term:
+            return idx
+        elif block_term > term:
+            return None
 
     return None
@@ -5,8 +5,8 @@ import time
 class MemoryChecker:
     def __init__(self, threshold: float, call_control: int = 100):
         """
-        Checks if memory has reached a certain threshold.
-        Calls to the has_reached_threshold only truly check memory used
+        Checks if the resident memory of the process has reached a certain
+        fraction of the total memory. Calls to the has_reached_threshold only truly check memory used
         every so often which results in false being returned in almost all of the calls.
         This behavior can be controlled by the 'call_control' parameter.
         :param threshold: Memory Threshold
@@ -18,7 +18,7 @@ class MemoryChecker:
         self.call_control = call_control
         self._call_count = 0
 
-    def has_reached_threshold(self):
+    def has_reached_threshold(self, postings_dictionary=None):
         self._call_count += 1
         if self._call_count % self.call_control == 0:
             return self._check_memory()
@@ -26,11 +26,25 @@ class MemoryChecker:
         return False
 
     def _check_memory(self):
-        used_memory = self._self_process.memory_info().vms
+        used_memory = self._self_process.memory_info().rss
         total_memory = psutil.virtual_memory().total
 
         return (used_memory / total_memory) > self.threshold
 
 
+class BlockMemoryChecker:
+    def __init__(self, block_memory: int):
+        """
+        Checks if the postings dictionary of a block has reached a memory budget.
+        Unlike MemoryChecker the decision only depends on the documents in the
+        block, so blocks have the same size on every machine.
+        :param block_memory: Memory budget of a block in bytes.
+        """
+        self.block_memory = block_memory
+
+    def has_reached_threshold(self, postings_dictionary):
+        return postings_dictionary.size_in_bytes >= self.block_memory
+
+
 def format_time_interval(time_stamp):
     return time.strftime('%H:%M:%S', time.gmtime(time_stamp))